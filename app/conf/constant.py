@@ -1 +1,5 @@
 EXAMPLE_CONSTANT = 0
+
+# Keyset pagination of the list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
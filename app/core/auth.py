@@ -1,5 +1,12 @@
+import asyncio
+import hashlib
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
@@ -7,6 +14,8 @@ from passlib.context import CryptContext
 SECRET_KEY = "super-secret-key-for-lab"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+REFRESH_TOKEN_EXPIRE_DAYS = 14
+ADMIN_USERNAME = "admin"
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
@@ -22,6 +31,72 @@ def get_password_hash(password):
     """
     return pwd_context.hash(password)
 
+class PasswordHasher:
+    """
+    Runs PBKDF2 hashing and verification on a bounded thread pool, so a burst of
+    logins or sign-ups no longer blocks the event loop. hashlib releases the GIL
+    while deriving keys, so up to `workers` hashes run in parallel while the loop
+    keeps serving other requests; further calls wait in the pool queue.
+    """
+
+    def __init__(self, workers: int = 4, rounds: Optional[int] = None):
+        """
+        :param workers: Maximum number of concurrent hash computations.
+        :param rounds: PBKDF2 rounds of new hashes (passlib's default if None). Verification uses the rounds stored in each hash.
+        """
+        self.workers = workers
+        self.context = (
+            CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto", pbkdf2_sha256__rounds=rounds)
+            if rounds else pwd_context
+        )
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._maxQueued = 0
+
+    async def hash(self, password: str) -> str:
+        """Generates a PBKDF2 hash for a given password."""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifies a plain text password against a stored PBKDF2 hash."""
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            self._queued += 1
+            self._maxQueued = max(self._maxQueued, self._queued)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._track, fn, *args)
+
+    def _track(self, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the pool size, the calls waiting for a worker (queue depth) and the calls running."""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queued,
+                "max_queued": self._maxQueued,
+                "running": self._running,
+                "completed": self._completed,
+            }
+
+    def shutdown(self) -> None:
+        """Stops the worker threads once the queued calls are done."""
+        self._executor.shutdown(wait=True)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     Creates a JWT access token encoding the provided data and expiration.
@@ -31,7 +106,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -45,3 +120,104 @@ def decode_access_token(token: str):
         return payload if payload.get("sub") else None
     except JWTError:
         return None
+
+
+class TokenRevocations:
+    """
+    In-memory list of users whose tokens issued before a given time are no longer
+    accepted (deleted users, renamed users, password changes). Entries are kept
+    for the lifetime of an access token, after which the revoked tokens expire anyway.
+    The list is per process: another worker keeps accepting the revoked tokens until they expire.
+    """
+
+    def __init__(self, ttl: float = ACCESS_TOKEN_EXPIRE_MINUTES * 60):
+        self.ttl = ttl
+        self._revokedAt: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def revokeUser(self, user_id: int) -> None:
+        """Rejects every token of `user_id` issued until now."""
+        now = time.time()
+        with self._lock:
+            self._revokedAt[user_id] = now
+            # Forget revocations older than any token still valid
+            expired = [uid for uid, at in self._revokedAt.items() if at < now - self.ttl]
+            for uid in expired:
+                del self._revokedAt[uid]
+
+    def isRevoked(self, user_id: int, issued_at: float) -> bool:
+        """Tells whether a token of `user_id` issued at `issued_at` was revoked."""
+        revokedAt = self._revokedAt.get(user_id)
+        return revokedAt is not None and issued_at <= revokedAt
+
+
+token_revocations = TokenRevocations()
+
+
+@dataclass
+class TokenUser:
+    """
+    The authenticated user as described by the claims of its access token,
+    available without reading the user from the database.
+    """
+    id: int
+    username: str
+    role: str
+    issued_at: float
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == "admin"
+
+
+def get_role(username: str) -> str:
+    """
+    Returns the role claim of a user: "admin" for the admin account, "user" otherwise.
+    """
+    return "admin" if username == ADMIN_USERNAME else "user"
+
+
+def create_user_token(user_id: int, username: str) -> str:
+    """
+    Creates an access token carrying the claims get_token_user needs (sub, id, role).
+    """
+    return create_access_token(
+        data={"sub": username, "id": user_id, "role": get_role(username)},
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
+def create_refresh_token() -> Tuple[str, str, datetime]:
+    """
+    Generates an opaque, single-use refresh token.
+    Only its SHA-256 digest is stored, a refresh costs one hash and one indexed lookup instead of a PBKDF2 verification.
+    :return: (token for the client, digest to store, expiration date).
+    """
+    token = secrets.token_urlsafe(32)
+    return token, hash_refresh_token(token), datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Returns the digest under which a refresh token is stored.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def get_token_user(token: str) -> Optional[TokenUser]:
+    """
+    Decodes an access token into a TokenUser.
+    Returns None if the token is invalid, lacks the id/role claims or was revoked.
+    """
+    payload = decode_access_token(token)
+    if not payload or payload.get("id") is None or payload.get("role") is None:
+        return None
+    user = TokenUser(
+        id=payload["id"],
+        username=payload["sub"],
+        role=payload["role"],
+        issued_at=payload.get("iat", 0.0)
+    )
+    if token_revocations.isRevoked(user.id, user.issued_at):
+        return None
+    return user
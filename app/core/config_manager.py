@@ -3,6 +3,7 @@ import logging
 import os
 import pathlib
 import sys
+from typing import Optional
 
 from app.utils.tools import listContains
 
@@ -28,6 +29,24 @@ MANDATORY_KEYS = [
 ]
 AVA_DB_TYPE = ["sqlite", "mysql", "postgresql", "mongodb"]
 DEFAULT_DB_TYPE = "sqlite"
+AVA_ID_STRATEGY = ["counter", "block", "snowflake"]
+DEFAULT_ID_STRATEGY = "counter"
+DEFAULT_ID_BLOCK_SIZE = 100
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_CACHE_TTL = 30.0
+DEFAULT_HASH_WORKERS = min(4, os.cpu_count() or 1)
+AVA_RATE_LIMIT_BACKEND = ["memory", "sqlite"]
+DEFAULT_RATE_LIMIT_BACKEND = "memory"
+DEFAULT_RATE_LIMIT_PATH = pathlib.Path(__file__).parent.resolve() / "db" / "rate_limits.db"
+DEFAULT_RATE_LIMITS = {"login": "10/60", "predict": "60/60", "predict_batch": "20/60"}
+DEFAULT_PREDICT_BATCH_SIZE = 32
+DEFAULT_PREDICT_BATCH_WAIT_MS = 5.0
+DEFAULT_PREDICT_MAX_TITLES = 100
+DEFAULT_PREDICT_CACHE_SIZE = 10000
+DEFAULT_PREDICT_CACHE_PATH = pathlib.Path(__file__).parent.resolve() / "db" / "predictions.db"
+DEFAULT_PREDICT_SERVER_TIMEOUT = 2.0
+AVA_PREDICT_BACKEND = ["tensorflow", "numpy"]
+DEFAULT_PREDICT_BACKEND = "tensorflow"
 
 
 class ConfigManager:
@@ -148,3 +167,151 @@ class ConfigManager:
     def getMongoDBName(self) -> str:
         """Returns the MongoDB database name."""
         return self.config["DATABASE"]["DB"]
+
+    def getIdStrategy(self) -> str:
+        """Returns how document IDs are generated: counter (default), block or snowflake."""
+        res = self.config["DATABASE"].get("ID_STRATEGY", "")
+        if res == "" or not (res in AVA_ID_STRATEGY):
+            res = DEFAULT_ID_STRATEGY
+        return res
+
+    def getIdBlockSize(self) -> int:
+        """Returns the number of IDs reserved at once by the block ID strategy."""
+        res = self.config["DATABASE"].get("ID_BLOCK_SIZE", "")
+        try:
+            return max(int(res), 1)
+        except ValueError:
+            return DEFAULT_ID_BLOCK_SIZE
+
+    def getWorkerId(self) -> Optional[int]:
+        """
+        Returns the worker ID used by the snowflake ID strategy (0-63), from the WORKER_ID
+        environment variable or the conf. None means a worker ID is leased from the database.
+        """
+        res = os.getenv("WORKER_ID", self.config["DATABASE"].get("WORKER_ID", ""))
+        try:
+            return int(res)
+        except ValueError:
+            return None
+
+    def getCacheSize(self) -> int:
+        """Returns the maximum number of entries of the entity cache (0 disables it)."""
+        res = self.config["DATABASE"].get("CACHE_SIZE", "")
+        try:
+            return max(int(res), 0)
+        except ValueError:
+            return DEFAULT_CACHE_SIZE
+
+    def getCacheTtl(self) -> float:
+        """Returns how many seconds the entity cache serves an entry before fetching it again."""
+        res = self.config["DATABASE"].get("CACHE_TTL", "")
+        try:
+            return max(float(res), 0.0)
+        except ValueError:
+            return DEFAULT_CACHE_TTL
+
+    def getHashWorkers(self) -> int:
+        """Returns how many password hashes may be computed concurrently."""
+        res = self.config["APP"].get("HASH_WORKERS", "")
+        try:
+            return max(int(res), 1)
+        except ValueError:
+            return DEFAULT_HASH_WORKERS
+
+    def getHashRounds(self) -> Optional[int]:
+        """Returns the PBKDF2 rounds of new password hashes, None for passlib's default."""
+        res = self.config["APP"].get("HASH_ROUNDS", "")
+        try:
+            return max(int(res), 1000)
+        except ValueError:
+            return None
+
+    def getRateLimit(self, route: str) -> str:
+        """
+        Returns the rate limit of a route ("login", "predict", "predict_batch") as "<requests>/<seconds>"
+        per client, "off" for no limit, from the RATE_LIMIT_<ROUTE> key.
+        """
+        res = self.config["APP"].get(f"RATE_LIMIT_{route.upper()}", "")
+        return res if res != "" else DEFAULT_RATE_LIMITS.get(route, "off")
+
+    def getRateLimitBackend(self) -> str:
+        """Returns where rate limit buckets are kept: memory (per process, default) or sqlite (shared)."""
+        res = self.config["APP"].get("RATE_LIMIT_BACKEND", "")
+        if res == "" or not (res in AVA_RATE_LIMIT_BACKEND):
+            res = DEFAULT_RATE_LIMIT_BACKEND
+        return res
+
+    def getRateLimitPath(self) -> str:
+        """Returns the SQLite file shared by the workers with the sqlite rate limit backend."""
+        res = self.config["APP"].get("RATE_LIMIT_PATH", "")
+        if res == "":
+            DEFAULT_RATE_LIMIT_PATH.parent.mkdir(parents=True, exist_ok=True)
+            res = str(DEFAULT_RATE_LIMIT_PATH)
+        return res
+
+    def getPredictBatchSize(self) -> int:
+        """Returns the maximum number of distinct titles predicted in one forward pass."""
+        res = self.config["APP"].get("PREDICT_BATCH_SIZE", "")
+        try:
+            return max(int(res), 1)
+        except ValueError:
+            return DEFAULT_PREDICT_BATCH_SIZE
+
+    def getPredictBatchWaitMs(self) -> float:
+        """Returns how many milliseconds a price prediction waits for others to batch with."""
+        res = self.config["APP"].get("PREDICT_BATCH_WAIT_MS", "")
+        try:
+            return max(float(res), 0.0)
+        except ValueError:
+            return DEFAULT_PREDICT_BATCH_WAIT_MS
+
+    def getPredictMaxTitles(self) -> int:
+        """Returns the maximum number of titles or item IDs accepted by one batch prediction request."""
+        res = self.config["APP"].get("PREDICT_MAX_TITLES", "")
+        try:
+            return max(int(res), 1)
+        except ValueError:
+            return DEFAULT_PREDICT_MAX_TITLES
+
+    def getPredictCacheSize(self) -> int:
+        """Returns the number of predictions kept in memory (0 disables the in-memory tier)."""
+        res = self.config["APP"].get("PREDICT_CACHE_SIZE", "")
+        try:
+            return max(int(res), 0)
+        except ValueError:
+            return DEFAULT_PREDICT_CACHE_SIZE
+
+    def getPredictCachePath(self) -> Optional[str]:
+        """Returns the SQLite file persisting the predictions, or None when set to "off"."""
+        res = self.config["APP"].get("PREDICT_CACHE_PATH", "")
+        if res.lower() == "off":
+            return None
+        if res == "":
+            DEFAULT_PREDICT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            res = str(DEFAULT_PREDICT_CACHE_PATH)
+        return res
+
+    def getPredictServerSocket(self) -> Optional[str]:
+        """Returns the Unix socket of the inference server, or None to predict in process."""
+        res = self.config["APP"].get("PREDICT_SERVER_SOCKET", "")
+        return res or None
+
+    def getPredictServerTimeout(self) -> float:
+        """Returns how many seconds a prediction waits for the inference server."""
+        res = self.config["APP"].get("PREDICT_SERVER_TIMEOUT", "")
+        try:
+            return max(float(res), 0.1)
+        except ValueError:
+            return DEFAULT_PREDICT_SERVER_TIMEOUT
+
+    def getPredictServerFallback(self) -> bool:
+        """Returns whether predictions fall back to an in-process model when the inference server is unavailable."""
+        res = self.config["APP"].get("PREDICT_SERVER_FALLBACK", "")
+        return res.lower() not in ("0", "false", "off", "no")
+
+    def getPredictBackend(self) -> str:
+        """Returns how the price model runs: tensorflow (saved_model.keras, default) or numpy (exported weights)."""
+        res = self.config["APP"].get("PREDICT_BACKEND", "")
+        if res == "" or not (res in AVA_PREDICT_BACKEND):
+            res = DEFAULT_PREDICT_BACKEND
+        return res
@@ -0,0 +1,701 @@
+import asyncio
+import logging
+from typing import List, Any, Optional, Type, Sequence, Callable, Awaitable
+from datetime import datetime
+from decimal import Decimal
+
+from pymongo import AsyncMongoClient, ReturnDocument, ASCENDING
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.core.config_manager import ConfigManager
+from app.core.db.db_model import User, Item, Transaction, Rating, ItemStatus
+from app.core.db.id_generator import IdStrategy, SnowflakeIdStrategy, createIdStrategy
+from app.core.db.entity_cache import EntityCache
+from app.core.db.db_manager import (
+    INDEXES, COLLECTIONS, DEFAULT_CHUNK_SIZE, USER_PUBLIC_FIELDS, ITEM_PUBLIC_FIELDS,
+    BulkInsertResult, ChunkFailure, chunked, toMongoValues, normalizeItemUpdate,
+    buildAvailableItemsQuery, buildRelevancePipeline, applyKeyset, isTransactional, cacheKeys,
+    WORKER_LEASE_TTL, WORKER_LEASE_RENEW_SECONDS, workerLeaseOwner, workerLeaseClaim, noFreeWorkerId
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDBManager:
+    """
+    Asynchronous counterpart of DBManager used by the API.
+    Exposes the same method surface, but every database call is awaited so a
+    slow query no longer blocks the event loop of the worker.
+    """
+
+    def __init__(self, configManager: ConfigManager):
+        self.dbType = configManager.getDBType()
+        self.dbUrl = configManager.getDBUrl()
+        self.dbName = configManager.getMongoDBName()
+        # The client connects lazily, on the first awaited operation
+        self.client: AsyncMongoClient = AsyncMongoClient(self.dbUrl)
+        self.db: AsyncDatabase = self.client[self.dbName]
+
+        # Collections
+        self.users: AsyncCollection = self.db["users"]
+        self.items: AsyncCollection = self.db["items"]
+        self.transactions: AsyncCollection = self.db["transactions"]
+        self.ratings: AsyncCollection = self.db["ratings"]
+        self.counters: AsyncCollection = self.db["counters"]
+        self.refreshTokens: AsyncCollection = self.db["refresh_tokens"]
+        self.workerLeases: AsyncCollection = self.db["worker_leases"]
+        self.idStrategy: IdStrategy = createIdStrategy(
+            configManager.getIdStrategy(), configManager.getIdBlockSize(), configManager.getWorkerId()
+        )
+        # Public user and item lookups by ID / username
+        self.cache = EntityCache(configManager.getCacheSize(), configManager.getCacheTtl())
+        # Detected in connect()
+        self.supportsTransactions = False
+        # Worker ID lease, renewed by a background task until close()
+        self.leaseOwner = ""
+        self._leasedWorkerId: Optional[int] = None
+        self._leaseTask: Optional[asyncio.Task] = None
+
+    async def connect(self) -> None:
+        """
+        Ensure indexes exist and lease a snowflake worker ID if needed.
+        Must be awaited once before serving requests.
+        """
+        await self.ensureIndexes()
+        await self._leaseWorkerId()
+        self.supportsTransactions = await self._detectTransactions()
+        logger.info(f"Connected to MongoDB at {self.dbUrl}")
+
+    async def ensureIndexes(self) -> None:
+        """Create every index listed in INDEXES (no-op for existing ones)."""
+        for collection_name, keys, options in INDEXES:
+            await self.db[collection_name].create_index(keys, **options)
+
+    async def _leaseWorkerId(self) -> None:
+        """
+        Gives the snowflake ID strategy a worker ID if none was configured: claims the lease
+        of the first free (or expired) worker ID and renews it in a background task.
+        :raises RuntimeError: If every worker ID is leased by a running process.
+        """
+        if not isinstance(self.idStrategy, SnowflakeIdStrategy) or self.idStrategy.workerId is not None:
+            return
+        # Built here rather than in __init__: the API workers are forked after importing main
+        self.leaseOwner = workerLeaseOwner()
+        for workerId in range(SnowflakeIdStrategy.MAX_WORKERS):
+            if await self._claimWorkerLease(workerId):
+                self.idStrategy.workerId = self._leasedWorkerId = workerId
+                self._leaseTask = asyncio.create_task(self._renewWorkerLease())
+                logger.info(f"Leased snowflake worker ID {workerId}")
+                return
+        raise noFreeWorkerId()
+
+    async def _claimWorkerLease(self, workerId: int) -> bool:
+        """Claims (or renews) the lease of a worker ID. Returns False if another process holds it."""
+        query, update = workerLeaseClaim(workerId, self.leaseOwner, datetime.utcnow())
+        try:
+            await self.workerLeases.update_one(query, update, upsert=True)
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _renewWorkerLease(self) -> None:
+        """
+        Renews the worker ID lease until close(). IDs are refused while the lease may have
+        expired (database unreachable), and for good once another process took it over.
+        """
+        expiresAt = datetime.utcnow() + WORKER_LEASE_TTL
+        while True:
+            await asyncio.sleep(WORKER_LEASE_RENEW_SECONDS)
+            try:
+                renewed = await self._claimWorkerLease(self._leasedWorkerId)
+            except PyMongoError as e:
+                logger.warning(f"Unable to renew the worker ID lease with exception {e}")
+                if datetime.utcnow() >= expiresAt:
+                    self.idStrategy.workerId = None
+                continue
+            if not renewed:
+                logger.error(f"Lost the lease of snowflake worker ID {self._leasedWorkerId}, no more IDs are generated")
+                self.idStrategy.workerId = None
+                return
+            expiresAt = datetime.utcnow() + WORKER_LEASE_TTL
+            self.idStrategy.workerId = self._leasedWorkerId
+
+    async def _releaseWorkerId(self) -> None:
+        """Stops renewing the worker ID lease and frees it for the next process."""
+        if self._leaseTask is not None:
+            self._leaseTask.cancel()
+            self._leaseTask = None
+        if self._leasedWorkerId is None:
+            return
+        try:
+            await self.workerLeases.delete_one({"_id": self._leasedWorkerId, "owner": self.leaseOwner})
+        except PyMongoError as e:
+            logger.warning(f"Unable to release the worker ID lease with exception {e}")
+        self._leasedWorkerId = None
+
+    async def _detectTransactions(self) -> bool:
+        """Checks whether multi-document transactions are available (replica set or sharded cluster)."""
+        try:
+            return isTransactional(await self.client.admin.command("hello"))
+        except PyMongoError as e:
+            logger.warning(f"Unable to detect transaction support with exception {e}")
+            return False
+
+    async def _runAtomically(self, callback: Callable[[Any], Awaitable[Any]]) -> Any:
+        """
+        Runs callback(session) inside a multi-document transaction when the deployment
+        supports it, otherwise runs callback(None) and relies on single-document atomicity.
+        """
+        if not self.supportsTransactions:
+            return await callback(None)
+        async with self.client.start_session() as session:
+            return await session.with_transaction(callback)
+
+    async def _reserveIds(self, counter_name: str, count: int) -> int:
+        """Reserves `count` values of a counter document and returns the last one."""
+        result = await self.counters.find_one_and_update(
+            {"_id": counter_name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return result["seq"]
+
+    async def _getNextIds(self, collection_name: str, count: int) -> List[int]:
+        """Allocates `count` new document IDs with the configured ID strategy."""
+        ids = self.idStrategy.allocate(collection_name, count)
+        while ids is None:
+            size = self.idStrategy.reservationSize(count)
+            last = await self._reserveIds(collection_name, size)
+            self.idStrategy.addRange(collection_name, last - size + 1, last)
+            ids = self.idStrategy.allocate(collection_name, count)
+        return ids
+
+    async def _getNextId(self, collection_name: str) -> int:
+        """Allocates one new document ID with the configured ID strategy."""
+        return (await self._getNextIds(collection_name, 1))[0]
+
+    async def insertRow(self, row: Any) -> Optional[Any]:
+        """
+        Inserts a new document into the appropriate collection.
+        :param row: The model instance to add (User, Item, Transaction, or Rating).
+        :return: The persisted row, with its new ID set, or None on failure.
+        """
+        try:
+            if isinstance(row, User):
+                row.id = await self._getNextId("users")
+                await self.users.insert_one(row.to_dict())
+            elif isinstance(row, Item):
+                row.id = await self._getNextId("items")
+                await self.items.insert_one(row.to_dict())
+            elif isinstance(row, Transaction):
+                row.id = await self._getNextId("transactions")
+                await self.transactions.insert_one(row.to_dict())
+            elif isinstance(row, Rating):
+                row.id = await self._getNextId("ratings")
+                await self.ratings.insert_one(row.to_dict())
+            else:
+                logger.warning(f"Unknown row type: {type(row)}")
+                return None
+            # The new ID / username may be cached as missing
+            self.cache.invalidate(*cacheKeys(row))
+            return row
+        except Exception as e:
+            logger.warning(f"Unable to insert row with exception {e}")
+            return None
+
+    async def insertRows(
+        self,
+        rows: Sequence[Any],
+        chunkSize: int = DEFAULT_CHUNK_SIZE,
+        ordered: bool = False
+    ) -> BulkInsertResult:
+        """
+        Inserts many documents of the same type with one insert_many per chunk.
+        IDs are allocated for all rows at once and set on the model instances.
+        :param rows: Model instances, all of the same type (User, Item, Transaction or Rating).
+        :param chunkSize: Maximum number of documents sent per insert_many.
+        :param ordered: Stop at the first failing document (and chunk) instead of inserting the rest.
+        :return: The number of inserted documents and the failures of each chunk.
+        """
+        result = BulkInsertResult()
+        if not rows:
+            return result
+        rowType = type(rows[0])
+        if rowType not in COLLECTIONS or any(type(row) is not rowType for row in rows):
+            raise TypeError("insertRows expects rows of a single model type")
+        collection_name = COLLECTIONS[rowType]
+
+        try:
+            ids = await self._getNextIds(collection_name, len(rows))
+        except PyMongoError as e:
+            logger.warning(f"Unable to allocate IDs for {len(rows)} rows with exception {e}")
+            result.failures.append(ChunkFailure(index=0, inserted=0, errors=[str(e)]))
+            return result
+        for row, row_id in zip(rows, ids):
+            row.id = row_id
+            self.cache.invalidate(*cacheKeys(row))
+
+        collection = self.db[collection_name]
+        for index, chunk in enumerate(chunked(rows, chunkSize)):
+            try:
+                inserted = await collection.insert_many([row.to_dict() for row in chunk], ordered=ordered)
+                result.inserted += len(inserted.inserted_ids)
+            except PyMongoError as e:
+                logger.warning(f"Unable to insert chunk {index} into {collection_name} with exception {e}")
+                result.addChunkError(index, e)
+                if ordered:
+                    break
+        return result
+
+    async def removeRow(self, row: Any) -> bool:
+        """
+        Remove a document from its collection.
+        :param row: The model instance to delete.
+        :return: Boolean indicating success.
+        """
+        try:
+            if isinstance(row, User):
+                await self.users.delete_one({"id": row.id})
+            elif isinstance(row, Item):
+                await self.items.delete_one({"id": row.id})
+            elif isinstance(row, Transaction):
+                await self.transactions.delete_one({"id": row.id})
+            elif isinstance(row, Rating):
+                await self.ratings.delete_one({"id": row.id})
+            else:
+                return False
+            self.cache.invalidate(*cacheKeys(row))
+            return True
+        except Exception as e:
+            logger.warning(f"Unable to remove row with exception {e}")
+            return False
+
+    async def getRows(self, objType: Type) -> List[Any]:
+        """Get all documents from a collection."""
+        try:
+            if objType == User:
+                return [User.from_dict(doc) async for doc in self.users.find()]
+            elif objType == Item:
+                return [Item.from_dict(doc) async for doc in self.items.find()]
+            elif objType == Transaction:
+                return [Transaction.from_dict(doc) async for doc in self.transactions.find()]
+            elif objType == Rating:
+                return [Rating.from_dict(doc) async for doc in self.ratings.find()]
+            return []
+        except Exception as e:
+            logger.warning(f"Unable to get rows: {e}")
+            return []
+
+    async def getUsers(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        projection: Optional[dict] = USER_PUBLIC_FIELDS
+    ) -> List[User]:
+        """
+        Get users ordered by ID, one keyset page at a time.
+        :param limit: Maximum number of users to return (all if None).
+        :param after_id: Only return users whose ID is greater than this one.
+        :param projection: Fields to fetch, public profile fields by default (None for all).
+        """
+        try:
+            cursor = self.users.find(applyKeyset({}, after_id), projection).sort("id", ASCENDING)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            return [User.from_dict(doc) async for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Unable to get users: {e}")
+            return []
+
+    async def getUserById(self, user_id: int, projection: Optional[dict] = None) -> Optional[User]:
+        """
+        Find a user by their ID, fetching only the `projection` fields if given.
+        Public profiles (USER_PUBLIC_FIELDS) are served from the entity cache.
+        """
+        cached = projection == USER_PUBLIC_FIELDS
+        if cached:
+            found, user = self.cache.get(("user", user_id))
+            if found:
+                return user
+        doc = await self.users.find_one({"id": user_id}, projection)
+        user = User.from_dict(doc) if doc else None
+        if cached:
+            self.cache.set(("user", user_id), user)
+        return user
+
+    async def getUserByUsername(self, username: str, projection: Optional[dict] = None) -> Optional[User]:
+        """
+        Find a user by their username, fetching only the `projection` fields if given.
+        Public profiles (USER_PUBLIC_FIELDS) are served from the entity cache.
+        """
+        cached = projection == USER_PUBLIC_FIELDS
+        if cached:
+            # username -> ID, then the cached profile of that ID
+            found, user_id = self.cache.get(("username", username))
+            if found and user_id is None:
+                return None
+            if found:
+                found, user = self.cache.get(("user", user_id))
+                # A renamed user no longer matches: fall through to the database
+                if found and user is not None and user.username == username:
+                    return user
+        doc = await self.users.find_one({"username": username}, projection)
+        user = User.from_dict(doc) if doc else None
+        if cached:
+            self.cache.set(("username", username), user.id if user else None)
+            if user:
+                self.cache.set(("user", user.id), user)
+        return user
+
+    async def deleteUserById(self, user_id: int) -> bool:
+        """Delete a user by their ID."""
+        try:
+            result = await self.users.delete_one({"id": user_id})
+            self.cache.invalidate(("user", user_id))
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.warning(f"Unable to delete user {user_id}: {e}")
+            return False
+
+    async def updateUser(self, user_id: int, update_data: dict) -> Optional[User]:
+        """Update a user's attributes."""
+        try:
+            # Convert Decimal to float for MongoDB
+            toMongoValues(update_data)
+
+            doc = await self.users.find_one_and_update(
+                {"id": user_id},
+                {"$set": update_data},
+                projection=USER_PUBLIC_FIELDS,
+                return_document=ReturnDocument.AFTER
+            )
+            self.cache.invalidate(("user", user_id))
+            if "username" in update_data:
+                # The new username may be cached as missing
+                self.cache.invalidate(("username", update_data["username"]))
+            return User.from_dict(doc) if doc else None
+        except Exception as e:
+            logger.warning(f"Unable to update user {user_id}: {e}")
+            return None
+
+    async def getAvailableItems(
+        self,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        keyword: Optional[str] = None,
+        min_seller_rating: Optional[float] = None,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        sort_by_relevance: bool = False,
+        after_score: Optional[float] = None,
+        projection: Optional[dict] = ITEM_PUBLIC_FIELDS
+    ) -> List[Item]:
+        """
+        Retrieves items with status 'AVAILABLE', optionally filtered, ordered by ID.
+        :param limit: Maximum number of items to return (all if None).
+        :param after_id: Only return items whose ID is greater than this one.
+        :param sort_by_relevance: With a keyword, order by decreasing text score instead.
+        :param after_score: Text score of the last item of the previous page (relevance order).
+        :param projection: Fields to fetch, public item fields by default (None for all).
+        """
+        try:
+            query = buildAvailableItemsQuery(min_price, max_price, keyword, min_seller_rating)
+            if keyword and sort_by_relevance:
+                cursor = await self.items.aggregate(
+                    buildRelevancePipeline(query, limit, after_id, after_score, projection)
+                )
+            else:
+                cursor = self.items.find(applyKeyset(query, after_id), projection).sort("id", ASCENDING)
+                if limit is not None:
+                    cursor = cursor.limit(limit)
+
+            return [Item.from_dict(doc) async for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Error getting available items: {e}")
+            return []
+
+    async def getItemById(self, item_id: int, projection: Optional[dict] = ITEM_PUBLIC_FIELDS) -> Optional[Item]:
+        """
+        Retrieves an item by its ID (unique index lookup).
+        Only public item fields are fetched unless another projection is given (None for all);
+        those public views are served from the entity cache.
+        """
+        cached = projection == ITEM_PUBLIC_FIELDS
+        if cached:
+            found, item = self.cache.get(("item", item_id))
+            if found:
+                return item
+        try:
+            doc = await self.items.find_one({"id": item_id}, projection)
+        except Exception as e:
+            logger.warning(f"Error getting item {item_id}: {e}")
+            return None
+        item = Item.from_dict(doc) if doc else None
+        if cached:
+            self.cache.set(("item", item_id), item)
+        return item
+
+    async def getItemsByIds(self, item_ids: List[int], projection: Optional[dict] = ITEM_PUBLIC_FIELDS) -> List[Item]:
+        """
+        Retrieves several items by ID in one query, ordered by ID. Unknown IDs are skipped.
+        Only public item fields are fetched unless another projection is given (None for all).
+        """
+        try:
+            cursor = self.items.find({"id": {"$in": list(item_ids)}}, projection).sort("id", ASCENDING)
+            return [Item.from_dict(doc) async for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Error getting items {item_ids}: {e}")
+            return []
+
+    async def getItemsBySeller(
+        self,
+        seller_id: int,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        projection: Optional[dict] = ITEM_PUBLIC_FIELDS
+    ) -> List[Item]:
+        """
+        Retrieves the items belonging to a specific user, ordered by ID.
+        Only public item fields are fetched unless another projection is given (None for all).
+        """
+        try:
+            query = applyKeyset({"owner_id": seller_id}, after_id)
+            cursor = self.items.find(query, projection).sort("id", ASCENDING)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            return [Item.from_dict(doc) async for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Error getting items by seller: {e}")
+            return []
+
+    async def updateItem(self, item_id: int, update_data: dict, owner_id: Optional[int] = None) -> Optional[Item]:
+        """
+        Updates an item's attributes and returns the updated item.
+        :param owner_id: If given, only update the item if it belongs to this user.
+        :return: The updated item, or None if no (matching) item was found.
+        """
+        try:
+            # Handle status enum conversion and Decimal to float
+            normalizeItemUpdate(update_data)
+
+            query = {"id": item_id}
+            if owner_id is not None:
+                query["owner_id"] = owner_id
+            doc = await self.items.find_one_and_update(
+                query,
+                {"$set": update_data},
+                projection=ITEM_PUBLIC_FIELDS,
+                return_document=ReturnDocument.AFTER
+            )
+            if doc:
+                self.cache.invalidate(("item", item_id))
+            return Item.from_dict(doc) if doc else None
+        except Exception as e:
+            logger.warning(f"Unable to update item {item_id}: {e}")
+            return None
+
+    async def purchaseItem(self, buyer_id: int, item_id: int) -> Optional[Transaction]:
+        """
+        Handles the purchase of an item.
+        - Atomically marks the item as 'SOLD' if it is available and not owned by the buyer,
+          so concurrent buyers can never both get it.
+        - Creates and returns a Transaction record.
+        Both writes share a multi-document transaction when the deployment supports it.
+        """
+        try:
+            transaction = await self._runAtomically(lambda session: self._purchaseItem(buyer_id, item_id, session))
+            if transaction:
+                self.cache.invalidate(("item", item_id))
+            return transaction
+        except Exception as e:
+            logger.error(f"Purchase failed for item {item_id} by buyer {buyer_id}: {e}")
+            return None
+
+    async def _purchaseItem(self, buyer_id: int, item_id: int, session) -> Optional[Transaction]:
+        """Purchase steps of purchaseItem, run with `session` (None outside a transaction)."""
+        # 1. Flip the status, only if the item is available and the buyer is not the seller
+        item_doc = await self.items.find_one_and_update(
+            {"id": item_id, "status": ItemStatus.AVAILABLE.value, "owner_id": {"$ne": buyer_id}},
+            {"$set": {"status": ItemStatus.SOLD.value}},
+            projection={"_id": 0, "owner_id": 1, "price": 1},
+            session=session
+        )
+        if not item_doc:
+            logger.warning(f"Item {item_id} not found, not available, or owned by buyer {buyer_id}")
+            return None
+
+        # 2. Create Transaction
+        transaction = Transaction(
+            seller_id=item_doc["owner_id"],
+            buyer_id=buyer_id,
+            item_id=item_id,
+            transaction_price=Decimal(str(item_doc["price"]))
+        )
+        transaction.id = await self._getNextId("transactions")
+        try:
+            await self.transactions.insert_one(transaction.to_dict(), session=session)
+        except Exception:
+            if session is None:
+                # Nothing to roll back: put the item back on sale
+                await self.items.update_one(
+                    {"id": item_id, "status": ItemStatus.SOLD.value},
+                    {"$set": {"status": ItemStatus.AVAILABLE.value}}
+                )
+            raise
+        return transaction
+
+    async def rateSeller(self, rater_id: int, transaction_id: int, score: int) -> Optional[Rating]:
+        """
+        Submits a rating for a transaction.
+        - Verification: Rater must be the buyer.
+        - Verification: Transaction must not have been rated yet.
+        - Side Effect: Adds the score to the seller's rating_sum/rating_count and
+          derives the seller's average rating from them.
+        """
+        try:
+            # 1. Verify transaction
+            tx_doc = await self.transactions.find_one(
+                {"id": transaction_id}, {"_id": 0, "buyer_id": 1, "seller_id": 1}
+            )
+            if not tx_doc:
+                logger.warning(f"Transaction {transaction_id} not found")
+                return None
+
+            tx = Transaction.from_dict(tx_doc)
+
+            # 2. Verify rater is buyer
+            if tx.buyer_id != rater_id:
+                logger.warning(f"User {rater_id} is not the buyer of transaction {transaction_id}")
+                return None
+
+            # 3. Check if already rated
+            existing = await self.ratings.find_one({"transaction_id": transaction_id}, {"_id": 1})
+            if existing:
+                logger.warning(f"Transaction {transaction_id} already rated")
+                return None
+
+            # 4. Create rating and update the seller totals
+            rating = Rating(
+                transaction_id=transaction_id,
+                rater_id=rater_id,
+                rated_id=tx.seller_id,
+                score=score
+            )
+            rating.id = await self._getNextId("ratings")
+            totals = await self._runAtomically(lambda session: self._insertRating(rating, session))
+
+            # 5. Derive the average. Guarded by rating_count so that a concurrent,
+            # more recent rating is never overwritten with an older average.
+            if totals and totals.get("rating_count"):
+                avg_score = round(totals["rating_sum"] / totals["rating_count"], 2)
+                updated = await self.users.update_one(
+                    {"id": tx.seller_id, "rating_count": totals["rating_count"]},
+                    {"$set": {"rating": avg_score}}
+                )
+                self.cache.invalidate(("user", tx.seller_id))
+                if updated.matched_count:
+                    await self.items.update_many(
+                        {"owner_id": tx.seller_id},
+                        {"$set": {"seller_rating": avg_score}}
+                    )
+
+            return rating
+        except Exception as e:
+            logger.error(f"Rating failed: {e}")
+            return None
+
+    async def _insertRating(self, rating: Rating, session) -> Optional[dict]:
+        """
+        Inserts the rating and increments the rated user's rating_sum/rating_count,
+        with `session` (None outside a transaction). Returns the updated totals.
+        """
+        await self.ratings.insert_one(rating.to_dict(), session=session)
+        try:
+            return await self.users.find_one_and_update(
+                {"id": rating.rated_id},
+                {"$inc": {"rating_sum": rating.score, "rating_count": 1}},
+                projection={"_id": 0, "rating_sum": 1, "rating_count": 1},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+        except Exception:
+            if session is None:
+                # Nothing to roll back: drop the rating so the totals stay consistent
+                await self.ratings.delete_one({"id": rating.id})
+            raise
+
+    async def insertRefreshToken(
+        self, token_hash: str, user_id: int, username: str, family: str, expires_at: datetime
+    ) -> bool:
+        """
+        Stores a refresh token digest.
+        :param family: Identifier shared by a token and all the tokens it was rotated into.
+        """
+        try:
+            await self.refreshTokens.insert_one({
+                "token_hash": token_hash,
+                "user_id": user_id,
+                "username": username,
+                "family": family,
+                "used": False,
+                "expires_at": expires_at,
+            })
+            return True
+        except Exception as e:
+            logger.warning(f"Unable to store refresh token of user {user_id}: {e}")
+            return False
+
+    async def useRefreshToken(self, token_hash: str) -> Optional[dict]:
+        """
+        Consumes a refresh token: marks it used and returns its user_id, username and family,
+        if it exists, was not used yet and has not expired.
+        Presenting an already used token revokes its whole family, as it was probably stolen.
+        """
+        try:
+            doc = await self.refreshTokens.find_one_and_update(
+                {"token_hash": token_hash, "used": False, "expires_at": {"$gt": datetime.utcnow()}},
+                {"$set": {"used": True}},
+                projection={"_id": 0, "user_id": 1, "username": 1, "family": 1}
+            )
+            if doc:
+                return doc
+            reused = await self.refreshTokens.find_one({"token_hash": token_hash, "used": True}, {"_id": 0, "family": 1})
+            if reused:
+                logger.warning(f"Refresh token reused, revoking token family {reused['family']}")
+                await self.refreshTokens.delete_many({"family": reused["family"]})
+            return None
+        except Exception as e:
+            logger.warning(f"Unable to use refresh token: {e}")
+            return None
+
+    async def revokeRefreshTokens(self, user_id: Optional[int] = None, family: Optional[str] = None) -> int:
+        """
+        Deletes the refresh tokens of a user, or of a token family.
+        :return: The number of deleted tokens.
+        """
+        query = {"user_id": user_id} if family is None else {"family": family}
+        try:
+            result = await self.refreshTokens.delete_many(query)
+            return result.deleted_count
+        except Exception as e:
+            logger.warning(f"Unable to revoke refresh tokens: {e}")
+            return 0
+
+    async def dropAllCollections(self):
+        """Drop all collections - used for database reset."""
+        await self.users.drop()
+        await self.items.drop()
+        await self.transactions.drop()
+        await self.ratings.drop()
+        await self.counters.drop()
+        await self.refreshTokens.drop()
+        self.cache.clear()
+        logger.info("All collections dropped")
+
+    async def close(self):
+        """Release the worker ID lease and close the MongoDB connection."""
+        await self._releaseWorkerId()
+        await self.client.close()
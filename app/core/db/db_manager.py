@@ -1,16 +1,248 @@
 import logging
-from typing import List, Any, Optional, Type, Dict
+import math
+import os
+import socket
+import threading
+import uuid
+from dataclasses import dataclass, field
+from typing import List, Any, Optional, Type, Dict, Sequence, Callable, Tuple
+from datetime import datetime, timedelta
 from decimal import Decimal
 
-from pymongo import MongoClient
+from pydantic import BaseModel
+
+from pymongo import MongoClient, ReturnDocument, ASCENDING, DESCENDING, TEXT, UpdateOne, UpdateMany
 from pymongo.database import Database
 from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 
 from app.core.config_manager import ConfigManager
 from app.core.db.db_model import User, Item, Transaction, Rating, ItemStatus
+from app.core.db.db_schema import UserResponse, ItemResponse
+from app.core.db.id_generator import IdStrategy, SnowflakeIdStrategy, createIdStrategy
+from app.core.db.entity_cache import EntityCache
 
 logger = logging.getLogger(__name__)
 
+# (collection, keys, options) for every index the application relies on.
+INDEXES = [
+    ("users", "username", {"unique": True}),
+    ("users", "email", {"unique": True}),
+    ("users", "id", {"unique": True}),
+    ("items", "id", {"unique": True}),
+    # Keyset pagination of the item listings (equality filter, sort key, then range filter)
+    ("items", [("status", ASCENDING), ("id", ASCENDING), ("seller_rating", ASCENDING)], {}),
+    ("items", [("owner_id", ASCENDING), ("id", ASCENDING)], {}),
+    # Keyword search (a collection can only have one text index)
+    (
+        "items",
+        [("name", TEXT), ("description", TEXT)],
+        {"name": "items_text", "weights": {"name": 3, "description": 1}, "default_language": "english"}
+    ),
+    ("transactions", "id", {"unique": True}),
+    ("ratings", "id", {"unique": True}),
+    ("ratings", "transaction_id", {"unique": True}),
+    # Ratings received by a user (rating totals backfill)
+    ("ratings", "rated_id", {}),
+    # Refresh tokens: lookup by digest, revocation by family or user, expired ones purged by MongoDB
+    ("refresh_tokens", "token_hash", {"unique": True}),
+    ("refresh_tokens", "family", {}),
+    ("refresh_tokens", "user_id", {}),
+    ("refresh_tokens", "expires_at", {"expireAfterSeconds": 0}),
+]
+
+
+# Collection holding each document type
+COLLECTIONS: Dict[Type, str] = {
+    User: "users",
+    Item: "items",
+    Transaction: "transactions",
+    Rating: "ratings",
+}
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class ChunkFailure:
+    """Documents of one insertRows chunk that could not be inserted."""
+    index: int  # Position of the chunk in the insertRows call
+    inserted: int  # Documents of the chunk inserted anyway
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class BulkInsertResult:
+    """Outcome of an insertRows call."""
+    inserted: int = 0
+    failures: List[ChunkFailure] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+    def addChunkError(self, index: int, error: PyMongoError) -> None:
+        """Records the failure of chunk `index`, counting what it inserted before failing."""
+        if isinstance(error, BulkWriteError):
+            inserted = error.details.get("nInserted", 0)
+            errors = [writeError["errmsg"] for writeError in error.details.get("writeErrors", [])]
+        else:
+            inserted, errors = 0, [str(error)]
+        self.inserted += inserted
+        self.failures.append(ChunkFailure(index=index, inserted=inserted, errors=errors))
+
+
+def chunked(rows: Sequence[Any], chunkSize: int):
+    """Yields consecutive slices of at most `chunkSize` rows."""
+    for start in range(0, len(rows), chunkSize):
+        yield rows[start:start + chunkSize]
+
+
+def projectionFor(schema: Type[BaseModel]) -> Dict[str, int]:
+    """Build a MongoDB projection fetching only the fields of a response schema."""
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in schema.model_fields})
+    return projection
+
+
+# Fields read when a document is only sent back to API clients
+USER_PUBLIC_FIELDS = projectionFor(UserResponse)
+ITEM_PUBLIC_FIELDS = projectionFor(ItemResponse)
+
+
+def storedEstimate(price: float) -> Optional[float]:
+    """Rounds a price model estimate to cents, None if the model returned NaN or infinity."""
+    return round(float(price), 2) if math.isfinite(price) else None
+
+
+def toMongoValues(update_data: dict) -> dict:
+    """Convert Decimal values to float so they can be stored by MongoDB."""
+    for key, value in update_data.items():
+        if isinstance(value, Decimal):
+            update_data[key] = float(value)
+    return update_data
+
+
+def normalizeItemUpdate(update_data: dict) -> dict:
+    """Convert an item update payload to MongoDB values, dropping invalid statuses."""
+    if "status" in update_data:
+        status_val = update_data["status"]
+        if hasattr(status_val, 'value'):
+            update_data["status"] = status_val.value
+        elif isinstance(status_val, str):
+            # Validate it's a valid status
+            try:
+                ItemStatus(status_val)
+            except ValueError:
+                del update_data["status"]
+    return toMongoValues(update_data)
+
+
+def buildAvailableItemsQuery(
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    keyword: Optional[str] = None,
+    min_seller_rating: Optional[float] = None
+) -> Dict[str, Any]:
+    """Build the MongoDB filter used to list available items."""
+    query: Dict[str, Any] = {"status": ItemStatus.AVAILABLE.value}
+
+    if min_price is not None:
+        query["price"] = query.get("price", {})
+        query["price"]["$gte"] = min_price
+    if max_price is not None:
+        query["price"] = query.get("price", {})
+        query["price"]["$lte"] = max_price
+    if keyword:
+        # Served by the items_text index instead of scanning every document
+        query["$text"] = {"$search": keyword}
+    if min_seller_rating is not None:
+        # Items carry a copy of their seller's rating, so no user lookup is needed
+        query["seller_rating"] = {"$gte": min_seller_rating}
+    return query
+
+
+def buildRelevancePipeline(
+    query: Dict[str, Any],
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    after_score: Optional[float] = None,
+    projection: Optional[Dict[str, int]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build the aggregation listing the items matching a $text query by decreasing
+    relevance, then by ID. (after_score, after_id) is the keyset position of the
+    last item of the previous page. The relevance score is always returned.
+    """
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": query},
+        {"$addFields": {"score": {"$meta": "textScore"}}},
+    ]
+    if after_score is not None and after_id is not None:
+        pipeline.append({"$match": {"$or": [
+            {"score": {"$lt": after_score}},
+            {"score": after_score, "id": {"$gt": after_id}},
+        ]}})
+    pipeline.append({"$sort": {"score": DESCENDING, "id": ASCENDING}})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    if projection is not None:
+        pipeline.append({"$project": {**projection, "score": 1}})
+    return pipeline
+
+
+def cacheKeys(row: Any) -> List[tuple]:
+    """Entity cache keys under which a model instance can be cached."""
+    if isinstance(row, User):
+        return [("user", row.id), ("username", row.username)]
+    if isinstance(row, Item):
+        return [("item", row.id)]
+    return []
+
+
+def isTransactional(hello: Dict[str, Any]) -> bool:
+    """
+    Tells from the `hello` command reply whether the deployment supports
+    multi-document transactions (replica set member or mongos).
+    """
+    return "setName" in hello or hello.get("msg") == "isdbgrid"
+
+
+# Snowflake worker ID leases: one document per worker ID in the `worker_leases` collection,
+# renewed while its process runs and free again WORKER_LEASE_TTL after the last renewal
+WORKER_LEASE_TTL = timedelta(seconds=60)
+WORKER_LEASE_RENEW_SECONDS = 20
+
+
+def workerLeaseOwner() -> str:
+    """Identifies the lease holder: host and PID for operators, plus a random part as PIDs are reused."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def workerLeaseClaim(workerId: int, owner: str, now: datetime) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (filter, update) claiming the lease of a worker ID if it is free, expired or already ours.
+    Applied with upsert: a missing lease is created, a lease held by a live process makes the
+    upsert collide on `_id` (DuplicateKeyError).
+    """
+    return (
+        {"_id": workerId, "$or": [{"expires_at": {"$lt": now}}, {"owner": owner}]},
+        {"$set": {"owner": owner, "expires_at": now + WORKER_LEASE_TTL}},
+    )
+
+
+def noFreeWorkerId() -> RuntimeError:
+    return RuntimeError(
+        f"All {SnowflakeIdStrategy.MAX_WORKERS} snowflake worker IDs are leased by running processes: "
+        f"stop one of them, wait for the leases of stopped ones to expire, or set WORKER_ID"
+    )
+
+
+def applyKeyset(query: Dict[str, Any], after_id: Optional[int]) -> Dict[str, Any]:
+    """Restrict a filter to the rows following `after_id` in `id` order."""
+    if after_id is not None:
+        query["id"] = {"$gt": after_id}
+    return query
+
 
 class DBManager:
     """
@@ -31,33 +263,134 @@ class DBManager:
         self.transactions: Collection = self.db["transactions"]
         self.ratings: Collection = self.db["ratings"]
         self.counters: Collection = self.db["counters"]
+        self.refreshTokens: Collection = self.db["refresh_tokens"]
+        self.workerLeases: Collection = self.db["worker_leases"]
+        self.idStrategy: IdStrategy = createIdStrategy(
+            configManager.getIdStrategy(), configManager.getIdBlockSize(), configManager.getWorkerId()
+        )
+        # Public user and item lookups by ID / username
+        self.cache = EntityCache(configManager.getCacheSize(), configManager.getCacheTtl())
+        # Worker ID lease, renewed by a background thread until close()
+        self.leaseOwner = workerLeaseOwner()
+        self._leasedWorkerId: Optional[int] = None
+        self._leaseStop = threading.Event()
         
         # Ensure indexes for unique fields
-        self.users.create_index("username", unique=True)
-        self.users.create_index("email", unique=True)
-        self.users.create_index("id", unique=True)
-        self.items.create_index("id", unique=True)
-        self.transactions.create_index("id", unique=True)
-        self.ratings.create_index("id", unique=True)
-        self.ratings.create_index("transaction_id", unique=True)
+        self.ensureIndexes()
+        self._leaseWorkerId()
+        self.supportsTransactions = self._detectTransactions()
         
         logger.info(f"Connected to MongoDB at {self.dbUrl}")
 
-    def _getNextId(self, collection_name: str) -> int:
-        """Auto-increment ID generator for MongoDB documents."""
+    def ensureIndexes(self) -> None:
+        """Create every index listed in INDEXES (no-op for existing ones)."""
+        for collection_name, keys, options in INDEXES:
+            self.db[collection_name].create_index(keys, **options)
+
+    def _leaseWorkerId(self) -> None:
+        """
+        Gives the snowflake ID strategy a worker ID if none was configured: claims the lease
+        of the first free (or expired) worker ID and renews it in a background thread.
+        :raises RuntimeError: If every worker ID is leased by a running process.
+        """
+        if not isinstance(self.idStrategy, SnowflakeIdStrategy) or self.idStrategy.workerId is not None:
+            return
+        for workerId in range(SnowflakeIdStrategy.MAX_WORKERS):
+            if self._claimWorkerLease(workerId):
+                self.idStrategy.workerId = self._leasedWorkerId = workerId
+                threading.Thread(target=self._renewWorkerLease, name="worker-lease", daemon=True).start()
+                logger.info(f"Leased snowflake worker ID {workerId}")
+                return
+        raise noFreeWorkerId()
+
+    def _claimWorkerLease(self, workerId: int) -> bool:
+        """Claims (or renews) the lease of a worker ID. Returns False if another process holds it."""
+        query, update = workerLeaseClaim(workerId, self.leaseOwner, datetime.utcnow())
+        try:
+            self.workerLeases.update_one(query, update, upsert=True)
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _renewWorkerLease(self) -> None:
+        """
+        Renews the worker ID lease until close(). IDs are refused while the lease may have
+        expired (database unreachable), and for good once another process took it over.
+        """
+        expiresAt = datetime.utcnow() + WORKER_LEASE_TTL
+        while not self._leaseStop.wait(WORKER_LEASE_RENEW_SECONDS):
+            try:
+                renewed = self._claimWorkerLease(self._leasedWorkerId)
+            except PyMongoError as e:
+                logger.warning(f"Unable to renew the worker ID lease with exception {e}")
+                if datetime.utcnow() >= expiresAt:
+                    self.idStrategy.workerId = None
+                continue
+            if not renewed:
+                logger.error(f"Lost the lease of snowflake worker ID {self._leasedWorkerId}, no more IDs are generated")
+                self.idStrategy.workerId = None
+                return
+            expiresAt = datetime.utcnow() + WORKER_LEASE_TTL
+            self.idStrategy.workerId = self._leasedWorkerId
+
+    def _releaseWorkerId(self) -> None:
+        """Stops renewing the worker ID lease and frees it for the next process."""
+        self._leaseStop.set()
+        if self._leasedWorkerId is None:
+            return
+        try:
+            self.workerLeases.delete_one({"_id": self._leasedWorkerId, "owner": self.leaseOwner})
+        except PyMongoError as e:
+            logger.warning(f"Unable to release the worker ID lease with exception {e}")
+        self._leasedWorkerId = None
+
+    def _detectTransactions(self) -> bool:
+        """Checks whether multi-document transactions are available (replica set or sharded cluster)."""
+        try:
+            return isTransactional(self.client.admin.command("hello"))
+        except PyMongoError as e:
+            logger.warning(f"Unable to detect transaction support with exception {e}")
+            return False
+
+    def _runAtomically(self, callback: Callable[[Any], Any]) -> Any:
+        """
+        Runs callback(session) inside a multi-document transaction when the deployment
+        supports it, otherwise runs callback(None) and relies on single-document atomicity.
+        """
+        if not self.supportsTransactions:
+            return callback(None)
+        with self.client.start_session() as session:
+            return session.with_transaction(callback)
+
+    def _reserveIds(self, counter_name: str, count: int) -> int:
+        """Reserves `count` values of a counter document and returns the last one."""
         result = self.counters.find_one_and_update(
-            {"_id": collection_name},
-            {"$inc": {"seq": 1}},
+            {"_id": counter_name},
+            {"$inc": {"seq": count}},
             upsert=True,
-            return_document=True
+            return_document=ReturnDocument.AFTER
         )
         return result["seq"]
 
-    def insertRow(self, row: Any) -> bool:
+    def _getNextIds(self, collection_name: str, count: int) -> List[int]:
+        """Allocates `count` new document IDs with the configured ID strategy."""
+        ids = self.idStrategy.allocate(collection_name, count)
+        while ids is None:
+            size = self.idStrategy.reservationSize(count)
+            last = self._reserveIds(collection_name, size)
+            self.idStrategy.addRange(collection_name, last - size + 1, last)
+            ids = self.idStrategy.allocate(collection_name, count)
+        return ids
+
+    def _getNextId(self, collection_name: str) -> int:
+        """Allocates one new document ID with the configured ID strategy."""
+        return self._getNextIds(collection_name, 1)[0]
+
+    def insertRow(self, row: Any) -> Optional[Any]:
         """
         Inserts a new document into the appropriate collection.
         :param row: The model instance to add (User, Item, Transaction, or Rating).
-        :return: Boolean indicating success.
+        :return: The persisted row, with its new ID set, or None on failure.
         """
         try:
             if isinstance(row, User):
@@ -74,11 +407,57 @@ class DBManager:
                 self.ratings.insert_one(row.to_dict())
             else:
                 logger.warning(f"Unknown row type: {type(row)}")
-                return False
-            return True
+                return None
+            # The new ID / username may be cached as missing
+            self.cache.invalidate(*cacheKeys(row))
+            return row
         except Exception as e:
             logger.warning(f"Unable to insert row with exception {e}")
-            return False
+            return None
+
+    def insertRows(
+        self,
+        rows: Sequence[Any],
+        chunkSize: int = DEFAULT_CHUNK_SIZE,
+        ordered: bool = False
+    ) -> BulkInsertResult:
+        """
+        Inserts many documents of the same type with one insert_many per chunk.
+        IDs are allocated for all rows at once and set on the model instances.
+        :param rows: Model instances, all of the same type (User, Item, Transaction or Rating).
+        :param chunkSize: Maximum number of documents sent per insert_many.
+        :param ordered: Stop at the first failing document (and chunk) instead of inserting the rest.
+        :return: The number of inserted documents and the failures of each chunk.
+        """
+        result = BulkInsertResult()
+        if not rows:
+            return result
+        rowType = type(rows[0])
+        if rowType not in COLLECTIONS or any(type(row) is not rowType for row in rows):
+            raise TypeError("insertRows expects rows of a single model type")
+        collection_name = COLLECTIONS[rowType]
+
+        try:
+            ids = self._getNextIds(collection_name, len(rows))
+        except PyMongoError as e:
+            logger.warning(f"Unable to allocate IDs for {len(rows)} rows with exception {e}")
+            result.failures.append(ChunkFailure(index=0, inserted=0, errors=[str(e)]))
+            return result
+        for row, row_id in zip(rows, ids):
+            row.id = row_id
+            self.cache.invalidate(*cacheKeys(row))
+
+        collection = self.db[collection_name]
+        for index, chunk in enumerate(chunked(rows, chunkSize)):
+            try:
+                inserted = collection.insert_many([row.to_dict() for row in chunk], ordered=ordered)
+                result.inserted += len(inserted.inserted_ids)
+            except PyMongoError as e:
+                logger.warning(f"Unable to insert chunk {index} into {collection_name} with exception {e}")
+                result.addChunkError(index, e)
+                if ordered:
+                    break
+        return result
 
     def removeRow(self, row: Any) -> bool:
         """
@@ -97,6 +476,7 @@ class DBManager:
                 self.ratings.delete_one({"id": row.id})
             else:
                 return False
+            self.cache.invalidate(*cacheKeys(row))
             return True
         except Exception as e:
             logger.warning(f"Unable to remove row with exception {e}")
@@ -118,20 +498,72 @@ class DBManager:
             logger.warning(f"Unable to get rows: {e}")
             return []
 
-    def getUserById(self, user_id: int) -> Optional[User]:
-        """Find a user by their ID."""
-        doc = self.users.find_one({"id": user_id})
-        return User.from_dict(doc) if doc else None
+    def getUsers(
+        self,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        projection: Optional[dict] = USER_PUBLIC_FIELDS
+    ) -> List[User]:
+        """
+        Get users ordered by ID, one keyset page at a time.
+        :param limit: Maximum number of users to return (all if None).
+        :param after_id: Only return users whose ID is greater than this one.
+        :param projection: Fields to fetch, public profile fields by default (None for all).
+        """
+        try:
+            cursor = self.users.find(applyKeyset({}, after_id), projection).sort("id", ASCENDING)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            return [User.from_dict(doc) for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Unable to get users: {e}")
+            return []
 
-    def getUserByUsername(self, username: str) -> Optional[User]:
-        """Find a user by their username."""
-        doc = self.users.find_one({"username": username})
-        return User.from_dict(doc) if doc else None
+    def getUserById(self, user_id: int, projection: Optional[dict] = None) -> Optional[User]:
+        """
+        Find a user by their ID, fetching only the `projection` fields if given.
+        Public profiles (USER_PUBLIC_FIELDS) are served from the entity cache.
+        """
+        cached = projection == USER_PUBLIC_FIELDS
+        if cached:
+            found, user = self.cache.get(("user", user_id))
+            if found:
+                return user
+        doc = self.users.find_one({"id": user_id}, projection)
+        user = User.from_dict(doc) if doc else None
+        if cached:
+            self.cache.set(("user", user_id), user)
+        return user
+
+    def getUserByUsername(self, username: str, projection: Optional[dict] = None) -> Optional[User]:
+        """
+        Find a user by their username, fetching only the `projection` fields if given.
+        Public profiles (USER_PUBLIC_FIELDS) are served from the entity cache.
+        """
+        cached = projection == USER_PUBLIC_FIELDS
+        if cached:
+            # username -> ID, then the cached profile of that ID
+            found, user_id = self.cache.get(("username", username))
+            if found and user_id is None:
+                return None
+            if found:
+                found, user = self.cache.get(("user", user_id))
+                # A renamed user no longer matches: fall through to the database
+                if found and user is not None and user.username == username:
+                    return user
+        doc = self.users.find_one({"username": username}, projection)
+        user = User.from_dict(doc) if doc else None
+        if cached:
+            self.cache.set(("username", username), user.id if user else None)
+            if user:
+                self.cache.set(("user", user.id), user)
+        return user
 
     def deleteUserById(self, user_id: int) -> bool:
         """Delete a user by their ID."""
         try:
             result = self.users.delete_one({"id": user_id})
+            self.cache.invalidate(("user", user_id))
             return result.deleted_count > 0
         except Exception as e:
             logger.warning(f"Unable to delete user {user_id}: {e}")
@@ -141,17 +573,19 @@ class DBManager:
         """Update a user's attributes."""
         try:
             # Convert Decimal to float for MongoDB
-            for key, value in update_data.items():
-                if isinstance(value, Decimal):
-                    update_data[key] = float(value)
+            toMongoValues(update_data)
             
-            result = self.users.update_one(
+            doc = self.users.find_one_and_update(
                 {"id": user_id},
-                {"$set": update_data}
+                {"$set": update_data},
+                projection=USER_PUBLIC_FIELDS,
+                return_document=ReturnDocument.AFTER
             )
-            if result.modified_count > 0 or result.matched_count > 0:
-                return self.getUserById(user_id)
-            return None
+            self.cache.invalidate(("user", user_id))
+            if "username" in update_data:
+                # The new username may be cached as missing
+                self.cache.invalidate(("username", update_data["username"]))
+            return User.from_dict(doc) if doc else None
         except Exception as e:
             logger.warning(f"Unable to update user {user_id}: {e}")
             return None
@@ -161,78 +595,113 @@ class DBManager:
         min_price: Optional[float] = None, 
         max_price: Optional[float] = None, 
         keyword: Optional[str] = None,
-        min_seller_rating: Optional[float] = None
+        min_seller_rating: Optional[float] = None,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        sort_by_relevance: bool = False,
+        after_score: Optional[float] = None,
+        projection: Optional[dict] = ITEM_PUBLIC_FIELDS
     ) -> List[Item]:
         """
-        Retrieves items with status 'AVAILABLE', optionally filtered.
+        Retrieves items with status 'AVAILABLE', optionally filtered, ordered by ID.
+        :param limit: Maximum number of items to return (all if None).
+        :param after_id: Only return items whose ID is greater than this one.
+        :param sort_by_relevance: With a keyword, order by decreasing text score instead.
+        :param after_score: Text score of the last item of the previous page (relevance order).
+        :param projection: Fields to fetch, public item fields by default (None for all).
         """
         try:
-            query: Dict[str, Any] = {"status": ItemStatus.AVAILABLE.value}
-            
-            if min_price is not None:
-                query["price"] = query.get("price", {})
-                query["price"]["$gte"] = min_price
-            if max_price is not None:
-                query["price"] = query.get("price", {})
-                query["price"]["$lte"] = max_price
-            if keyword:
-                query["$or"] = [
-                    {"name": {"$regex": keyword, "$options": "i"}},
-                    {"description": {"$regex": keyword, "$options": "i"}}
-                ]
-            
-            items = [Item.from_dict(doc) for doc in self.items.find(query)]
-            
-            # Filter by seller rating if needed
-            if min_seller_rating is not None:
-                filtered_items = []
-                for item in items:
-                    seller = self.getUserById(item.owner_id)
-                    if seller and float(seller.rating) >= min_seller_rating:
-                        filtered_items.append(item)
-                return filtered_items
-            
-            return items
+            query = buildAvailableItemsQuery(min_price, max_price, keyword, min_seller_rating)
+            if keyword and sort_by_relevance:
+                cursor = self.items.aggregate(
+                    buildRelevancePipeline(query, limit, after_id, after_score, projection)
+                )
+            else:
+                cursor = self.items.find(applyKeyset(query, after_id), projection).sort("id", ASCENDING)
+                if limit is not None:
+                    cursor = cursor.limit(limit)
+
+            return [Item.from_dict(doc) for doc in cursor]
         except Exception as e:
             logger.warning(f"Error getting available items: {e}")
             return []
 
-    def getItemsBySeller(self, seller_id: int) -> List[Item]:
-        """Retrieves all items belonging to a specific user."""
+    def getItemById(self, item_id: int, projection: Optional[dict] = ITEM_PUBLIC_FIELDS) -> Optional[Item]:
+        """
+        Retrieves an item by its ID (unique index lookup).
+        Only public item fields are fetched unless another projection is given (None for all);
+        those public views are served from the entity cache.
+        """
+        cached = projection == ITEM_PUBLIC_FIELDS
+        if cached:
+            found, item = self.cache.get(("item", item_id))
+            if found:
+                return item
+        try:
+            doc = self.items.find_one({"id": item_id}, projection)
+        except Exception as e:
+            logger.warning(f"Error getting item {item_id}: {e}")
+            return None
+        item = Item.from_dict(doc) if doc else None
+        if cached:
+            self.cache.set(("item", item_id), item)
+        return item
+
+    def getItemsByIds(self, item_ids: List[int], projection: Optional[dict] = ITEM_PUBLIC_FIELDS) -> List[Item]:
+        """
+        Retrieves several items by ID in one query, ordered by ID. Unknown IDs are skipped.
+        Only public item fields are fetched unless another projection is given (None for all).
+        """
+        try:
+            cursor = self.items.find({"id": {"$in": list(item_ids)}}, projection).sort("id", ASCENDING)
+            return [Item.from_dict(doc) for doc in cursor]
+        except Exception as e:
+            logger.warning(f"Error getting items {item_ids}: {e}")
+            return []
+
+    def getItemsBySeller(
+        self,
+        seller_id: int,
+        limit: Optional[int] = None,
+        after_id: Optional[int] = None,
+        projection: Optional[dict] = ITEM_PUBLIC_FIELDS
+    ) -> List[Item]:
+        """
+        Retrieves the items belonging to a specific user, ordered by ID.
+        Only public item fields are fetched unless another projection is given (None for all).
+        """
         try:
-            return [Item.from_dict(doc) for doc in self.items.find({"owner_id": seller_id})]
+            query = applyKeyset({"owner_id": seller_id}, after_id)
+            cursor = self.items.find(query, projection).sort("id", ASCENDING)
+            if limit is not None:
+                cursor = cursor.limit(limit)
+            return [Item.from_dict(doc) for doc in cursor]
         except Exception as e:
             logger.warning(f"Error getting items by seller: {e}")
             return []
 
-    def updateItem(self, item_id: int, update_data: dict) -> Optional[Item]:
-        """Updates an item's attributes."""
+    def updateItem(self, item_id: int, update_data: dict, owner_id: Optional[int] = None) -> Optional[Item]:
+        """
+        Updates an item's attributes and returns the updated item.
+        :param owner_id: If given, only update the item if it belongs to this user.
+        :return: The updated item, or None if no (matching) item was found.
+        """
         try:
-            # Handle status enum conversion
-            if "status" in update_data:
-                status_val = update_data["status"]
-                if hasattr(status_val, 'value'):
-                    update_data["status"] = status_val.value
-                elif isinstance(status_val, str):
-                    # Validate it's a valid status
-                    try:
-                        ItemStatus(status_val)
-                    except ValueError:
-                        del update_data["status"]
-            
-            # Convert Decimal to float
-            for key, value in update_data.items():
-                if isinstance(value, Decimal):
-                    update_data[key] = float(value)
-            
-            result = self.items.update_one(
-                {"id": item_id},
-                {"$set": update_data}
+            # Handle status enum conversion and Decimal to float
+            normalizeItemUpdate(update_data)
+
+            query = {"id": item_id}
+            if owner_id is not None:
+                query["owner_id"] = owner_id
+            doc = self.items.find_one_and_update(
+                query,
+                {"$set": update_data},
+                projection=ITEM_PUBLIC_FIELDS,
+                return_document=ReturnDocument.AFTER
             )
-            if result.modified_count > 0 or result.matched_count > 0:
-                doc = self.items.find_one({"id": item_id})
-                return Item.from_dict(doc) if doc else None
-            return None
+            if doc:
+                self.cache.invalidate(("item", item_id))
+            return Item.from_dict(doc) if doc else None
         except Exception as e:
             logger.warning(f"Unable to update item {item_id}: {e}")
             return None
@@ -240,80 +709,84 @@ class DBManager:
     def purchaseItem(self, buyer_id: int, item_id: int) -> Optional[Transaction]:
         """
         Handles the purchase of an item.
-        - Validates item availability.
-        - Checks that the buyer is not the seller.
-        - Updates item status to 'SOLD'.
+        - Atomically marks the item as 'SOLD' if it is available and not owned by the buyer,
+          so concurrent buyers can never both get it.
         - Creates and returns a Transaction record.
+        Both writes share a multi-document transaction when the deployment supports it.
         """
         try:
-            # 1. Fetch item
-            item_doc = self.items.find_one({"id": item_id})
-            if not item_doc:
-                logger.warning(f"Item {item_id} not found")
-                return None
-            
-            item = Item.from_dict(item_doc)
-            
-            # 2. Check if item is available
-            if item.status != ItemStatus.AVAILABLE:
-                logger.warning(f"Item {item_id} is not available (Status: {item.status})")
-                return None
-            
-            # 3. Prevent self-purchase
-            if item.owner_id == buyer_id:
-                logger.warning(f"Buyer {buyer_id} cannot purchase their own item {item_id}")
-                return None
-
-            # 4. Create Transaction
-            transaction = Transaction(
-                seller_id=item.owner_id,
-                buyer_id=buyer_id,
-                item_id=item_id,
-                transaction_price=item.price
-            )
-            transaction.id = self._getNextId("transactions")
-            self.transactions.insert_one(transaction.to_dict())
-            
-            # 5. Update Item Status
-            self.items.update_one(
-                {"id": item_id},
-                {"$set": {"status": ItemStatus.SOLD.value}}
-            )
-            
+            transaction = self._runAtomically(lambda session: self._purchaseItem(buyer_id, item_id, session))
+            if transaction:
+                self.cache.invalidate(("item", item_id))
             return transaction
-            
         except Exception as e:
             logger.error(f"Purchase failed for item {item_id} by buyer {buyer_id}: {e}")
             return None
 
+    def _purchaseItem(self, buyer_id: int, item_id: int, session) -> Optional[Transaction]:
+        """Purchase steps of purchaseItem, run with `session` (None outside a transaction)."""
+        # 1. Flip the status, only if the item is available and the buyer is not the seller
+        item_doc = self.items.find_one_and_update(
+            {"id": item_id, "status": ItemStatus.AVAILABLE.value, "owner_id": {"$ne": buyer_id}},
+            {"$set": {"status": ItemStatus.SOLD.value}},
+            projection={"_id": 0, "owner_id": 1, "price": 1},
+            session=session
+        )
+        if not item_doc:
+            logger.warning(f"Item {item_id} not found, not available, or owned by buyer {buyer_id}")
+            return None
+        
+        # 2. Create Transaction
+        transaction = Transaction(
+            seller_id=item_doc["owner_id"],
+            buyer_id=buyer_id,
+            item_id=item_id,
+            transaction_price=Decimal(str(item_doc["price"]))
+        )
+        transaction.id = self._getNextId("transactions")
+        try:
+            self.transactions.insert_one(transaction.to_dict(), session=session)
+        except Exception:
+            if session is None:
+                # Nothing to roll back: put the item back on sale
+                self.items.update_one(
+                    {"id": item_id, "status": ItemStatus.SOLD.value},
+                    {"$set": {"status": ItemStatus.AVAILABLE.value}}
+                )
+            raise
+        return transaction
+
     def rateSeller(self, rater_id: int, transaction_id: int, score: int) -> Optional[Rating]:
         """
         Submits a rating for a transaction.
         - Verification: Rater must be the buyer.
         - Verification: Transaction must not have been rated yet.
-        - Side Effect: Recalculates and updates the seller's average rating.
+        - Side Effect: Adds the score to the seller's rating_sum/rating_count and
+          derives the seller's average rating from them.
         """
         try:
             # 1. Verify transaction
-            tx_doc = self.transactions.find_one({"id": transaction_id})
+            tx_doc = self.transactions.find_one(
+                {"id": transaction_id}, {"_id": 0, "buyer_id": 1, "seller_id": 1}
+            )
             if not tx_doc:
                 logger.warning(f"Transaction {transaction_id} not found")
                 return None
-            
+
             tx = Transaction.from_dict(tx_doc)
-            
+
             # 2. Verify rater is buyer
             if tx.buyer_id != rater_id:
                 logger.warning(f"User {rater_id} is not the buyer of transaction {transaction_id}")
                 return None
-            
+
             # 3. Check if already rated
-            existing = self.ratings.find_one({"transaction_id": transaction_id})
+            existing = self.ratings.find_one({"transaction_id": transaction_id}, {"_id": 1})
             if existing:
                 logger.warning(f"Transaction {transaction_id} already rated")
                 return None
-            
-            # 4. Create rating
+
+            # 4. Create rating and update the seller totals
             rating = Rating(
                 transaction_id=transaction_id,
                 rater_id=rater_id,
@@ -321,26 +794,174 @@ class DBManager:
                 score=score
             )
             rating.id = self._getNextId("ratings")
-            self.ratings.insert_one(rating.to_dict())
+            totals = self._runAtomically(lambda session: self._insertRating(rating, session))
 
-            # 5. Update seller average rating
-            pipeline = [
-                {"$match": {"rated_id": tx.seller_id}},
-                {"$group": {"_id": None, "avg_score": {"$avg": "$score"}}}
-            ]
-            result = list(self.ratings.aggregate(pipeline))
-            if result:
-                avg_score = result[0]["avg_score"]
-                self.users.update_one(
-                    {"id": tx.seller_id},
-                    {"$set": {"rating": round(avg_score, 2)}}
+            # 5. Derive the average. Guarded by rating_count so that a concurrent,
+            # more recent rating is never overwritten with an older average.
+            if totals and totals.get("rating_count"):
+                avg_score = round(totals["rating_sum"] / totals["rating_count"], 2)
+                updated = self.users.update_one(
+                    {"id": tx.seller_id, "rating_count": totals["rating_count"]},
+                    {"$set": {"rating": avg_score}}
                 )
-            
+                self.cache.invalidate(("user", tx.seller_id))
+                if updated.matched_count:
+                    self.items.update_many(
+                        {"owner_id": tx.seller_id},
+                        {"$set": {"seller_rating": avg_score}}
+                    )
+
             return rating
         except Exception as e:
             logger.error(f"Rating failed: {e}")
             return None
 
+    def _insertRating(self, rating: Rating, session) -> Optional[dict]:
+        """
+        Inserts the rating and increments the rated user's rating_sum/rating_count,
+        with `session` (None outside a transaction). Returns the updated totals.
+        """
+        self.ratings.insert_one(rating.to_dict(), session=session)
+        try:
+            return self.users.find_one_and_update(
+                {"id": rating.rated_id},
+                {"$inc": {"rating_sum": rating.score, "rating_count": 1}},
+                projection={"_id": 0, "rating_sum": 1, "rating_count": 1},
+                return_document=ReturnDocument.AFTER,
+                session=session
+            )
+        except Exception:
+            if session is None:
+                # Nothing to roll back: drop the rating so the totals stay consistent
+                self.ratings.delete_one({"id": rating.id})
+            raise
+
+    def recomputeRatingTotals(self, batchSize: int = 500) -> int:
+        """
+        Rebuilds every user's rating_sum, rating_count and rating from the ratings
+        collection, and copies the rating onto their items (items.seller_rating).
+        Used after bulk loads and to backfill data written before the totals existed.
+        :param batchSize: Number of users updated per bulk_write.
+        :return: The number of users with at least one rating.
+        """
+        pipeline = [{"$group": {"_id": "$rated_id", "total": {"$sum": "$score"}, "count": {"$sum": 1}}}]
+        userOps, itemOps = [], []
+        rated = 0
+        for group in self.ratings.aggregate(pipeline):
+            avg_score = round(group["total"] / group["count"], 2)
+            userOps.append(UpdateOne(
+                {"id": group["_id"]},
+                {"$set": {"rating_sum": group["total"], "rating_count": group["count"], "rating": avg_score}}
+            ))
+            itemOps.append(UpdateMany({"owner_id": group["_id"]}, {"$set": {"seller_rating": avg_score}}))
+            rated += 1
+            if len(userOps) >= batchSize:
+                self.users.bulk_write(userOps, ordered=False)
+                self.items.bulk_write(itemOps, ordered=False)
+                userOps, itemOps = [], []
+        if userOps:
+            self.users.bulk_write(userOps, ordered=False)
+            self.items.bulk_write(itemOps, ordered=False)
+
+        self.cache.clear()
+
+        # Users that were never rated
+        self.users.update_many(
+            {"rating_count": {"$exists": False}},
+            {"$set": {"rating_sum": 0, "rating_count": 0}}
+        )
+        return rated
+
+    def scoreItems(
+        self, predictBatch: Callable[[List[str]], List[float]], modelVersion: str, batchSize: int = 1000
+    ) -> int:
+        """
+        Stores the price model estimate of every item not yet scored by `modelVersion`
+        (new items, and items scored by another version of the model).
+        Items are read by ID `batchSize` at a time; each chunk is predicted with one
+        `predictBatch` call and written back with one bulk_write. A write only applies
+        if the item still has the name that was scored.
+        :param predictBatch: Predicts the prices of a list of names, in order.
+        :return: The number of items updated.
+        """
+        scored = 0
+        lastId = None
+        while True:
+            query = {"model_version": {"$ne": modelVersion}}
+            if lastId is not None:
+                query["id"] = {"$gt": lastId}
+            docs = list(self.items.find(query, {"_id": 0, "id": 1, "name": 1}).sort("id", ASCENDING).limit(batchSize))
+            if not docs:
+                return scored
+            prices = predictBatch([doc["name"] for doc in docs])
+            operations = [
+                UpdateOne(
+                    {"id": doc["id"], "name": doc["name"]},
+                    {"$set": {"predicted_price": storedEstimate(price), "model_version": modelVersion}}
+                )
+                for doc, price in zip(docs, prices)
+            ]
+            scored += self.items.bulk_write(operations, ordered=False).modified_count
+            self.cache.invalidate(*(("item", doc["id"]) for doc in docs))
+            lastId = docs[-1]["id"]
+
+    def insertRefreshToken(
+        self, token_hash: str, user_id: int, username: str, family: str, expires_at: datetime
+    ) -> bool:
+        """
+        Stores a refresh token digest.
+        :param family: Identifier shared by a token and all the tokens it was rotated into.
+        """
+        try:
+            self.refreshTokens.insert_one({
+                "token_hash": token_hash,
+                "user_id": user_id,
+                "username": username,
+                "family": family,
+                "used": False,
+                "expires_at": expires_at,
+            })
+            return True
+        except Exception as e:
+            logger.warning(f"Unable to store refresh token of user {user_id}: {e}")
+            return False
+
+    def useRefreshToken(self, token_hash: str) -> Optional[dict]:
+        """
+        Consumes a refresh token: marks it used and returns its user_id, username and family,
+        if it exists, was not used yet and has not expired.
+        Presenting an already used token revokes its whole family, as it was probably stolen.
+        """
+        try:
+            doc = self.refreshTokens.find_one_and_update(
+                {"token_hash": token_hash, "used": False, "expires_at": {"$gt": datetime.utcnow()}},
+                {"$set": {"used": True}},
+                projection={"_id": 0, "user_id": 1, "username": 1, "family": 1}
+            )
+            if doc:
+                return doc
+            reused = self.refreshTokens.find_one({"token_hash": token_hash, "used": True}, {"_id": 0, "family": 1})
+            if reused:
+                logger.warning(f"Refresh token reused, revoking token family {reused['family']}")
+                self.refreshTokens.delete_many({"family": reused["family"]})
+            return None
+        except Exception as e:
+            logger.warning(f"Unable to use refresh token: {e}")
+            return None
+
+    def revokeRefreshTokens(self, user_id: Optional[int] = None, family: Optional[str] = None) -> int:
+        """
+        Deletes the refresh tokens of a user, or of a token family.
+        :return: The number of deleted tokens.
+        """
+        query = {"user_id": user_id} if family is None else {"family": family}
+        try:
+            result = self.refreshTokens.delete_many(query)
+            return result.deleted_count
+        except Exception as e:
+            logger.warning(f"Unable to revoke refresh tokens: {e}")
+            return 0
+
     def dropAllCollections(self):
         """Drop all collections - used for database reset."""
         self.users.drop()
@@ -348,8 +969,11 @@ class DBManager:
         self.transactions.drop()
         self.ratings.drop()
         self.counters.drop()
+        self.refreshTokens.drop()
+        self.cache.clear()
         logger.info("All collections dropped")
 
     def close(self):
-        """Close the MongoDB connection."""
+        """Release the worker ID lease and close the MongoDB connection."""
+        self._releaseWorkerId()
         self.client.close()
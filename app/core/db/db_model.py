@@ -18,6 +18,9 @@ class User:
     email: str
     password_hash: str
     rating: Decimal = Decimal("0.00")
+    # Running totals the rating is derived from, kept up to date by rateSeller
+    rating_sum: int = 0
+    rating_count: int = 0
     created_at: datetime = field(default_factory=datetime.utcnow)
     id: Optional[int] = None
     _id: Optional[Any] = None  # MongoDB ObjectId
@@ -30,6 +33,8 @@ class User:
             "email": self.email,
             "password_hash": self.password_hash,
             "rating": float(self.rating),
+            "rating_sum": self.rating_sum,
+            "rating_count": self.rating_count,
             "created_at": self.created_at,
         }
         if self.id is not None:
@@ -47,6 +52,8 @@ class User:
             email=data.get("email", ""),
             password_hash=data.get("password_hash", ""),
             rating=Decimal(str(data.get("rating", 0.0))),
+            rating_sum=data.get("rating_sum", 0),
+            rating_count=data.get("rating_count", 0),
             created_at=data.get("created_at", datetime.utcnow()),
         )
 
@@ -58,8 +65,12 @@ class Item:
     owner_id: int
     description: Optional[str] = None
     status: ItemStatus = ItemStatus.AVAILABLE
+    seller_rating: Decimal = Decimal("0.00")  # Copy of the owner's rating, kept in sync by rateSeller
+    predicted_price: Optional[Decimal] = None  # Price model estimate of the name, see app/utils/scoreItems.py
+    model_version: Optional[str] = None  # Version of the price model that computed predicted_price
     id: Optional[int] = None
     _id: Optional[Any] = None
+    score: Optional[float] = None  # Text search relevance, only set by keyword searches
 
     def to_dict(self) -> dict:
         """Convert to MongoDB document format."""
@@ -69,6 +80,9 @@ class Item:
             "price": float(self.price),
             "status": self.status.value,
             "owner_id": self.owner_id,
+            "seller_rating": float(self.seller_rating),
+            "predicted_price": float(self.predicted_price) if self.predicted_price is not None else None,
+            "model_version": self.model_version,
         }
         if self.id is not None:
             data["id"] = self.id
@@ -90,6 +104,10 @@ class Item:
             price=Decimal(str(data.get("price", 0.0))),
             status=status,
             owner_id=data.get("owner_id"),
+            seller_rating=Decimal(str(data.get("seller_rating", 0.0))),
+            predicted_price=Decimal(str(data["predicted_price"])) if data.get("predicted_price") is not None else None,
+            model_version=data.get("model_version"),
+            score=data.get("score"),
         )
 
 
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
@@ -26,6 +26,11 @@ class UserUpdate(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -38,6 +43,10 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserPage(BaseModel):
+    items: List[UserResponse]
+    next_cursor: Optional[str] = None
+
 class ItemBase(BaseModel):
     name: str
     description: Optional[str] = None
@@ -56,10 +65,17 @@ class ItemUpdate(BaseModel):
 class ItemResponse(ItemBase):
     id: int
     owner_id: int
+    # Stored price model estimate, None until the item is scored
+    predicted_price: Optional[Decimal] = None
+    model_version: Optional[str] = None
 
     class Config:
         from_attributes = True
 
+class ItemPage(BaseModel):
+    items: List[ItemResponse]
+    next_cursor: Optional[str] = None
+
 class TransactionCreate(BaseModel):
     buyer_id: int
     item_id: int
@@ -88,3 +104,16 @@ class RatingResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+class PricePredictionBatchRequest(BaseModel):
+    titles: List[str] = []
+    item_ids: List[int] = []
+
+class PricePrediction(BaseModel):
+    title: str
+    item_id: Optional[int] = None
+    predicted_price: float
+
+class PricePredictionBatchResponse(BaseModel):
+    predictions: List[PricePrediction]
+    missing_item_ids: List[int] = []
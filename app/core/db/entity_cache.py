@@ -0,0 +1,88 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+
+class EntityCache:
+    """
+    In-process LRU cache with a time-to-live, used by the DB managers in front of
+    hot single-entity lookups (users and items by ID, users by username).
+    Misses are cached too (as None), so repeated lookups of unknown keys do not
+    reach the database either. Writes going through the DB manager invalidate
+    the entries they touch; the TTL bounds how stale an entry can get when
+    another worker process changed the document.
+    """
+
+    def __init__(self, maxSize: int = 10000, ttl: float = 30.0):
+        """
+        :param maxSize: Maximum number of entries, least recently used ones are evicted first. 0 disables the cache.
+        :param ttl: Seconds an entry is served before it is fetched again.
+        """
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxSize > 0 and self.ttl > 0
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Looks `key` up.
+        :return: (True, value) on a hit, value being None for a cached miss, (False, None) otherwise.
+        """
+        if not self.enabled:
+            return False, None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # Callers get their own copy, so they cannot alter the cached entity
+        return True, copy.copy(entry[1])
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Caches `value` (None for a miss) under `key`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drops the entries of `keys`, if cached."""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Drops every entry (after bulk writes)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.maxSize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
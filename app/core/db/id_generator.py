@@ -0,0 +1,126 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class IdStrategy:
+    """
+    Allocates the integer `id` of new documents.
+    Strategies either generate IDs in-process, or hand out IDs from ranges the
+    DB manager reserved in the `counters` collection. In the latter case
+    allocate() returns None, the manager reserves reservationSize() IDs and
+    passes the range to addRange() before asking again.
+    """
+
+    def allocate(self, collection_name: str, count: int) -> Optional[List[int]]:
+        """Returns `count` new IDs, or None if a counter range must be reserved first."""
+        raise NotImplementedError
+
+    def reservationSize(self, count: int) -> int:
+        """Number of IDs to reserve in the counters collection to serve `count` IDs."""
+        return count
+
+    def addRange(self, collection_name: str, first: int, last: int) -> None:
+        """Makes the reserved IDs first..last (inclusive) available to allocate()."""
+        raise NotImplementedError
+
+
+class BlockIdStrategy(IdStrategy):
+    """
+    Reserves blocks of `blockSize` IDs at once and serves them from memory, so
+    only one insert out of `blockSize` pays the counter round trip. IDs are
+    increasing within a worker, but workers interleave their blocks.
+    """
+
+    def __init__(self, blockSize: int):
+        self.blockSize = blockSize
+        self._ranges: Dict[str, List[int]] = {}  # collection -> [next, last]
+        self._lock = threading.Lock()
+
+    def allocate(self, collection_name: str, count: int) -> Optional[List[int]]:
+        with self._lock:
+            current = self._ranges.get(collection_name)
+            if current is None or current[1] - current[0] + 1 < count:
+                return None
+            ids = list(range(current[0], current[0] + count))
+            current[0] += count
+            return ids
+
+    def reservationSize(self, count: int) -> int:
+        return max(self.blockSize, count)
+
+    def addRange(self, collection_name: str, first: int, last: int) -> None:
+        # IDs left in a previous, too small range are dropped: gaps are harmless
+        with self._lock:
+            self._ranges[collection_name] = [first, last]
+
+
+class CounterIdStrategy(BlockIdStrategy):
+    """
+    One counter increment per insert (or per bulk insert). IDs are gapless and
+    globally ordered, but every write serializes on the counter document.
+    """
+
+    def __init__(self):
+        super().__init__(blockSize=1)
+
+
+class SnowflakeIdStrategy(IdStrategy):
+    """
+    Time-ordered IDs generated in-process, without any database round trip.
+    Layout: milliseconds since EPOCH_MS (39 bits, ~17 years), worker ID (6 bits)
+    and a per-millisecond sequence (8 bits). IDs stay below 2**53 so that
+    JavaScript clients (the GUI) can represent them exactly, and are ordered by
+    creation time across workers, which keyset pagination relies on.
+    """
+
+    EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+    WORKER_BITS = 6
+    SEQUENCE_BITS = 8
+    MAX_WORKERS = 1 << WORKER_BITS
+
+    def __init__(self, workerId: Optional[int] = None):
+        # The worker ID can be leased from the database after construction
+        self.workerId = workerId
+        self._lastMs = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def allocate(self, collection_name: str, count: int) -> Optional[List[int]]:
+        if self.workerId is None:
+            raise RuntimeError("SnowflakeIdStrategy needs a worker ID before generating IDs")
+        with self._lock:
+            return [self._nextId() for _ in range(count)]
+
+    def _nextId(self) -> int:
+        nowMs = max(int(time.time() * 1000), self._lastMs)  # never go back in time
+        if nowMs == self._lastMs:
+            self._sequence = (self._sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+            if self._sequence == 0:
+                # Sequence exhausted for this millisecond, wait for the next one
+                while nowMs <= self._lastMs:
+                    nowMs = int(time.time() * 1000)
+        else:
+            self._sequence = 0
+        self._lastMs = nowMs
+        return (
+            ((nowMs - self.EPOCH_MS) << (self.WORKER_BITS + self.SEQUENCE_BITS))
+            | (self.workerId << self.SEQUENCE_BITS)
+            | self._sequence
+        )
+
+
+def createIdStrategy(name: str, blockSize: int = 100, workerId: Optional[int] = None) -> IdStrategy:
+    """
+    Builds the ID strategy selected in the configuration.
+    :param name: "counter", "block" or "snowflake".
+    :param blockSize: Number of IDs reserved at once by the "block" strategy.
+    :param workerId: Worker ID of the "snowflake" strategy, leased later if None.
+    """
+    if name == "counter":
+        return CounterIdStrategy()
+    if name == "block":
+        return BlockIdStrategy(blockSize)
+    if name == "snowflake":
+        return SnowflakeIdStrategy(workerId)
+    raise ValueError(f"Unknown ID strategy: {name}")
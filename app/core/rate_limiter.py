@@ -0,0 +1,218 @@
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+
+@dataclass
+class RateLimit:
+    """A token bucket: up to `capacity` requests at once, refilled at `capacity` per `period` seconds."""
+    capacity: int
+    period: float
+
+    @property
+    def refillRate(self) -> float:
+        """Tokens added per second."""
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, value: str) -> Optional["RateLimit"]:
+        """
+        Parses a "<requests>/<seconds>" setting, e.g. "10/60".
+        :return: The limit, or None for "0" / "off" (no limit).
+        :raises ValueError: if the value is malformed.
+        """
+        value = value.strip().lower()
+        if value in ("0", "off", "none"):
+            return None
+        count, _, period = value.partition("/")
+        limit = cls(int(count), float(period or 1))
+        if limit.capacity <= 0 or limit.period <= 0:
+            raise ValueError(f"Invalid rate limit: {value}")
+        return limit
+
+
+class RateLimitBackend:
+    """
+    Stores the token buckets. The in-memory backend limits each worker process on
+    its own; the SQLite backend shares the buckets between the workers of a host.
+    """
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        """
+        Takes one token from the bucket of `key`.
+        :return: 0 if the request is allowed, otherwise the seconds until a token is available.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _take(tokens: float, updated: float, now: float, limit: RateLimit) -> Tuple[float, float]:
+        """Refills a bucket up to now and takes one token. Returns (tokens left, wait)."""
+        tokens = min(limit.capacity, tokens + (now - updated) * limit.refillRate)
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / limit.refillRate
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Token buckets in a dict of this process."""
+
+    def __init__(self, maxKeys: int = 100000):
+        """
+        :param maxKeys: Buckets kept before the idle ones are pruned. When few of them are
+            idle, the next pruning waits until the dict doubles, so it stays amortized O(1).
+        """
+        self.maxKeys = maxKeys
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}  # key -> (tokens, updated, period)
+        self._pruneAt = maxKeys
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (limit.capacity, now, limit.period))
+            tokens, wait = self._take(tokens, updated, now, limit)
+            self._buckets[key] = (tokens, now, limit.period)
+            if len(self._buckets) > self._pruneAt:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle for a whole period of their own limit are full again: forgetting them changes nothing
+        idle = [key for key, (_, updated, period) in self._buckets.items() if now - updated > period]
+        for key in idle:
+            del self._buckets[key]
+        self._pruneAt = max(self.maxKeys, 2 * len(self._buckets))
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Token buckets in a local SQLite file, shared by every worker process using the
+    same path. Each acquire is one short write transaction.
+    """
+
+    def __init__(self, path: str, pruneInterval: float = 60):
+        """
+        :param pruneInterval: Seconds between two deletions of the idle buckets by this process.
+        """
+        self.path = path
+        self.pruneInterval = pruneInterval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lastPrune = time.time()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, period REAL NOT NULL)"
+            )
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(buckets)")]
+            if "period" not in columns:
+                # File of an older version: its buckets get pruned at once (they refill to full anyway)
+                try:
+                    connection.execute("ALTER TABLE buckets ADD COLUMN period REAL NOT NULL DEFAULT 0")
+                except sqlite3.OperationalError:
+                    pass  # added meanwhile by another worker
+            connection.execute("DROP INDEX IF EXISTS buckets_updated")
+            # Time a bucket is full again, when it can be deleted
+            connection.execute("CREATE INDEX IF NOT EXISTS buckets_idle ON buckets (updated + period)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        # Wall clock: the buckets are shared between processes
+        now = time.time()
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (limit.capacity, now)
+            tokens, wait = self._take(tokens, updated, now, limit)
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated, period) VALUES (?, ?, ?, ?)",
+                (key, tokens, now, limit.period)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        self._prune(now)
+        return wait
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle for a whole period of their own limit are full again: forgetting them changes nothing
+        with self._lock:
+            if now - self._lastPrune < self.pruneInterval:
+                return
+            self._lastPrune = now
+        self._connect().execute("DELETE FROM buckets WHERE updated + period < ?", (now,))
+
+
+def createRateLimitBackend(name: str, path: str) -> RateLimitBackend:
+    """
+    Builds the rate limit backend selected in the configuration.
+    :param name: "memory" or "sqlite".
+    :param path: SQLite file of the "sqlite" backend.
+    """
+    if name == "memory":
+        return MemoryRateLimitBackend()
+    if name == "sqlite":
+        return SQLiteRateLimitBackend(path)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
+def clientIp(request: Request) -> str:
+    """Rate limit key of an anonymous client: its IP address."""
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class RateLimiter:
+    """
+    FastAPI dependency enforcing a rate limit on a route. Requests over the limit
+    get a 429 response with a Retry-After header.
+    It is a plain (sync) callable, so FastAPI runs it in its thread pool and a
+    shared backend never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        route: str,
+        limit: Optional[RateLimit],
+        keyFunc: Callable[[Request], str] = clientIp
+    ):
+        """
+        :param route: Name of the limited route, prefixed to the bucket keys.
+        :param limit: The limit of each client, None for no limit.
+        :param keyFunc: Returns the client key of a request (IP address by default).
+        """
+        self.backend = backend
+        self.route = route
+        self.limit = limit
+        self.keyFunc = keyFunc
+        # Requests run in FastAPI's thread pool: the counter is shared between threads
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def __call__(self, request: Request) -> None:
+        if self.limit is None:
+            return
+        wait = self.backend.acquire(f"{self.route}:{self.keyFunc(request)}", self.limit)
+        if wait > 0:
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please retry later",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
@@ -4,7 +4,7 @@ from sys import path
 path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
 
 from app.core.db.db_model import User, Item, Transaction, ItemStatus, Rating
-from app.core.db.db_manager import DBManager
+from app.core.db.db_manager import DBManager, BulkInsertResult
 from app.core.config_manager import ConfigManager
 from app.core.auth import get_password_hash
 from decimal import Decimal
@@ -17,17 +17,19 @@ def dropAllCollections(dbManager: DBManager):
 
 def recreateIndexes(dbManager: DBManager):
     """Recreate indexes after dropping collections."""
-    dbManager.users.create_index("username", unique=True)
-    dbManager.users.create_index("email", unique=True)
-    dbManager.users.create_index("id", unique=True)
-    dbManager.items.create_index("id", unique=True)
-    dbManager.transactions.create_index("id", unique=True)
-    dbManager.ratings.create_index("id", unique=True)
-    dbManager.ratings.create_index("transaction_id", unique=True)
+    dbManager.ensureIndexes()
 
 
 import random
 
+
+def reportBulkInsert(label: str, result: BulkInsertResult):
+    """Print the outcome of an insertRows call."""
+    print(f"Populated {result.inserted} {label}.")
+    for failure in result.failures:
+        print(f"WARNING: chunk {failure.index} of {label} failed ({failure.inserted} inserted): {failure.errors[:3]}")
+
+
 def populateUsers(dbManager: DBManager):
     """Populate MongoDB with sample users."""
     # Add default accounts first
@@ -45,8 +47,6 @@ def populateUsers(dbManager: DBManager):
         password_hash=get_password_hash("test"),
         rating=Decimal("4.0")
     )
-    dbManager.insertRow(admin_user)
-    dbManager.insertRow(test_user)
     
     users = []
     
@@ -65,10 +65,9 @@ def populateUsers(dbManager: DBManager):
             password_hash=hashed_password,
             rating=Decimal(random.uniform(1.0, 5.0)).quantize(Decimal("0.0"))
         )
-        dbManager.insertRow(user)
         users.append(user)
     
-    print(f"Populated {len(users) + 2} users.")
+    reportBulkInsert("users", dbManager.insertRows([admin_user, test_user] + users))
     return users
 
 
@@ -125,12 +124,12 @@ def populateItems(dbManager: DBManager):
                     description=desc,
                     price=Decimal(price_val).quantize(Decimal("0.00")),
                     status=status,
-                    owner_id=owner.id
+                    owner_id=owner.id,
+                    seller_rating=owner.rating
                 )
-                dbManager.insertRow(item)
                 items.append(item)
             
-        print(f"Populated {len(items)} items from CSV.")
+        reportBulkInsert("items from CSV", dbManager.insertRows(items))
         return items
         
     except Exception as e:
@@ -157,13 +156,12 @@ def populateTransactionsAndRatings(dbManager: DBManager):
             item_id=item.id,
             transaction_price=item.price
         )
-        dbManager.insertRow(tx)
         transactions.append(tx)
     
-    print(f"Created {len(transactions)} transactions.")
+    reportBulkInsert("transactions", dbManager.insertRows(transactions))
     
     # Create ratings for ~80% of transactions
-    ratings_count = 0
+    ratings = []
     for tx in transactions:
         if random.random() < 0.8:
             rating = Rating(
@@ -172,25 +170,13 @@ def populateTransactionsAndRatings(dbManager: DBManager):
                 rated_id=tx.seller_id,
                 score=random.randint(3, 5)
             )
-            dbManager.insertRow(rating)
-            ratings_count += 1
+            ratings.append(rating)
     
-    print(f"Created {ratings_count} ratings.")
+    reportBulkInsert("ratings", dbManager.insertRows(ratings))
     
-    # Update seller ratings based on new ratings
-    for user in users:
-        pipeline = [
-            {"$match": {"rated_id": user.id}},
-            {"$group": {"_id": None, "avg_score": {"$avg": "$score"}}}
-        ]
-        result = list(dbManager.ratings.aggregate(pipeline))
-        if result:
-            avg_score = result[0]["avg_score"]
-            dbManager.users.update_one(
-                {"id": user.id},
-                {"$set": {"rating": round(avg_score, 1)}}
-            )
-
+    # Derive seller rating totals from the new ratings
+    rated = dbManager.recomputeRatingTotals()
+    print(f"Computed rating totals for {rated} sellers.")
 
 def main():
     print("Initializing MongoDB database...")
@@ -0,0 +1,55 @@
+import pathlib
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from pymongo import UpdateMany
+
+from app.core.db.db_manager import DBManager
+from app.core.config_manager import ConfigManager
+
+
+def backfillSellerRatings(dbManager: DBManager, batchSize: int = 500):
+    """
+    Copy each user's rating onto the items they own (items.seller_rating).
+    Needed once for items created before the field existed.
+    """
+    operations = []
+    updated = 0
+    for user in dbManager.users.find({}, {"_id": 0, "id": 1, "rating": 1}):
+        operations.append(UpdateMany(
+            {"owner_id": user["id"]},
+            {"$set": {"seller_rating": user.get("rating", 0.0)}}
+        ))
+        if len(operations) >= batchSize:
+            updated += dbManager.items.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        updated += dbManager.items.bulk_write(operations, ordered=False).modified_count
+    print(f"Backfilled seller_rating on {updated} items.")
+
+
+def backfillRatingTotals(dbManager: DBManager):
+    """
+    Compute users.rating_sum and users.rating_count from the existing ratings.
+    Needed once for users rated before rateSeller maintained the totals.
+    """
+    rated = dbManager.recomputeRatingTotals()
+    print(f"Backfilled rating totals for {rated} users.")
+
+
+def main():
+    print("Migrating MongoDB database...")
+
+    configManager = ConfigManager()
+    dbManager = DBManager(configManager)
+
+    backfillSellerRatings(dbManager)
+    backfillRatingTotals(dbManager)
+
+    print("MongoDB database migrated successfully.")
+    dbManager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import pathlib
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent.parent))
+
+from app.core.db.db_manager import DBManager
+from app.core.config_manager import ConfigManager
+from price_predictor.inference import model_version, predict_prices
+
+# Items predicted per forward pass and written per bulk_write
+BATCH_SIZE = 1000
+
+
+def main():
+    """
+    Stores the price model estimate (predicted_price) on every item that has none
+    or was scored by another model version. Run it after initDB.py and after each
+    new model (train.py, or export.py for the numpy backend).
+    """
+    print("Scoring items...")
+
+    configManager = ConfigManager()
+    dbManager = DBManager(configManager)
+
+    backend = configManager.getPredictBackend()
+    # Hash of the model file taken when the model was loaded, not of the file as it is now
+    version = model_version(backend)
+    scored = dbManager.scoreItems(lambda names: predict_prices(names, backend), version, BATCH_SIZE)
+
+    print(f"Scored {scored} items with the {backend} model {version[:12]}.")
+    dbManager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+import base64
+import binascii
+import json
 from typing import List, Any
 
 
@@ -16,3 +19,30 @@ def listContains(subList: List[Any], testList: List[Any]) -> bool:
     if counter == len(subList):
         res = True
     return res
+
+
+def encodeCursor(position: dict) -> str:
+    """
+    Encodes a keyset pagination position into an opaque, URL-safe cursor.
+    :param position: The sort key values of the last row of a page, e.g. {"id": 42}.
+    :return: The cursor string to hand to the client.
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decodeCursor(cursor: str) -> dict:
+    """
+    Decodes a cursor produced by encodeCursor.
+    :param cursor: The opaque cursor sent back by the client.
+    :return: The keyset pagination position.
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(position, dict):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return position
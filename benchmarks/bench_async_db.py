@@ -0,0 +1,69 @@
+"""
+Concurrent-request throughput of the synchronous DBManager vs AsyncDBManager.
+
+Each simulated request is a coroutine doing what an authenticated listing call
+does: one user lookup followed by a filtered item query. With DBManager every
+call blocks the event loop, so concurrent requests are serialized; with
+AsyncDBManager they overlap while waiting on MongoDB.
+
+Usage (needs a populated database, see app/utils/initDB.py):
+    python benchmarks/bench_async_db.py --requests 500 --concurrency 1 10 50
+"""
+import argparse
+import asyncio
+import pathlib
+import time
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.core.config_manager import ConfigManager
+from app.core.db.db_manager import DBManager
+from app.core.db.async_db_manager import AsyncDBManager
+
+
+async def syncRequest(dbManager: DBManager):
+    dbManager.getUserByUsername("test")
+    dbManager.getAvailableItems(min_price=100, max_price=101)
+
+
+async def asyncRequest(dbManager: AsyncDBManager):
+    await dbManager.getUserByUsername("test")
+    await dbManager.getAvailableItems(min_price=100, max_price=101)
+
+
+async def run(requestFn, dbManager, requests: int, concurrency: int) -> float:
+    """Runs `requests` simulated requests, `concurrency` at a time. Returns req/s."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await requestFn(dbManager)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, levels: list):
+    configManager = ConfigManager()
+    syncManager = DBManager(configManager)
+    asyncManager = AsyncDBManager(configManager)
+    await asyncManager.connect()
+
+    print(f"{'concurrency':>12} {'sync req/s':>12} {'async req/s':>12} {'speedup':>8}")
+    for concurrency in levels:
+        syncRate = await run(syncRequest, syncManager, requests, concurrency)
+        asyncRate = await run(asyncRequest, asyncManager, requests, concurrency)
+        print(f"{concurrency:>12} {syncRate:>12.1f} {asyncRate:>12.1f} {asyncRate / syncRate:>7.2f}x")
+
+    syncManager.close()
+    await asyncManager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
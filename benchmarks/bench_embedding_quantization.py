@@ -0,0 +1,66 @@
+"""
+Accuracy vs memory of the embedding storage modes of the NumPy price model.
+
+Each mode (float32, float16, int8 with per-row scales) is applied to the
+float32 export of price_predictor/export.py, then scored on the held-out split
+of train.py: the last 20% of the cleaned CSV rows, without the titles that have
+no token (which train.py skips). The report gives the weight memory, the MAE
+against the real prices, its change from float32, and how far the predictions
+move from float32.
+
+Usage (needs TensorFlow, imported by train.py, and a float32 export):
+    python benchmarks/bench_embedding_quantization.py --model-dir price_predictor/numpy_model
+"""
+import argparse
+import itertools
+import pathlib
+from sys import path
+
+import numpy as np
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+path.append(str(pathlib.Path(__file__).resolve().parent.parent / "price_predictor"))
+
+from price_predictor.inference import NUMPY_MODEL_DIR
+from price_predictor.numpy_runtime import EMBEDDING_MODES, NumpyPriceModel, quantize_embedding, tokenize
+from train import iter_rows, split_index
+
+
+def main(modelDir: str, batchSize: int):
+    reference = NumpyPriceModel.load(modelDir)
+    if reference.embeddingScale is not None or reference.embedding.dtype != np.float32:
+        raise SystemExit(f"{modelDir} is not a float32 export: re-run export.py with --embedding float32")
+    float32Embedding = reference.embedding
+
+    heldOut = [(title, price) for title, price in itertools.islice(iter_rows(), split_index(), None) if tokenize(title)]
+    titles, prices = [title for title, _ in heldOut], np.array([price for _, price in heldOut], dtype=np.float32)
+    print(f"Held-out split: {len(titles)} titles")
+
+    results = {}
+    for mode in EMBEDDING_MODES:
+        reference.embedding, reference.embeddingScale = quantize_embedding(float32Embedding, mode)
+        predicted = np.concatenate([
+            reference.predict(titles[i:i + batchSize]) for i in range(0, len(titles), batchSize)
+        ])
+        results[mode] = (reference.weightBytes(), reference.embedding.nbytes, predicted)
+
+    baselineMae = float(np.mean(np.abs(results["float32"][2] - prices)))
+    print(
+        f"{'mode':>8} {'weights KB':>11} {'embedding KB':>13} {'MAE':>10} {'MAE delta':>10} "
+        f"{'mean |diff|':>12} {'max |diff|':>11}"
+    )
+    for mode, (weightBytes, embeddingBytes, predicted) in results.items():
+        mae = float(np.mean(np.abs(predicted - prices)))
+        drift = np.abs(predicted - results["float32"][2])
+        print(
+            f"{mode:>8} {weightBytes / 1024:>11.1f} {embeddingBytes / 1024:>13.1f} {mae:>10.4f} "
+            f"{mae - baselineMae:>+10.4f} {drift.mean():>12.5f} {drift.max():>11.5f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default=NUMPY_MODEL_DIR)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+    main(args.model_dir, args.batch_size)
@@ -0,0 +1,79 @@
+"""
+Concurrent-insert throughput of the ID strategies (counter, block, snowflake).
+
+Each insert allocates an ID with the strategy under test and writes a small
+document into a scratch collection (dropped afterwards), the way insertRow does.
+The counter strategy serializes every insert on one counter document, the block
+strategy only once per block, and the snowflake strategy never.
+
+Usage (needs a running MongoDB):
+    python benchmarks/bench_id_generation.py --inserts 5000 --concurrency 50 --block-size 100
+"""
+import argparse
+import asyncio
+import pathlib
+import time
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.core.config_manager import ConfigManager
+from app.core.db.async_db_manager import AsyncDBManager
+from app.core.db.id_generator import createIdStrategy
+
+SCRATCH = "bench_ids"
+
+
+async def run(dbManager: AsyncDBManager, inserts: int, concurrency: int) -> tuple:
+    """Returns (inserts/s, counter round trips, all IDs unique)."""
+    scratch = dbManager.db[SCRATCH]
+    await scratch.drop()
+    await scratch.create_index("id", unique=True)
+    await dbManager.counters.delete_one({"_id": SCRATCH})
+
+    reservations = 0
+    reserveIds = dbManager._reserveIds
+
+    async def countingReserveIds(counter_name: str, count: int) -> int:
+        nonlocal reservations
+        reservations += 1
+        return await reserveIds(counter_name, count)
+
+    dbManager._reserveIds = countingReserveIds
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def insert(i: int):
+        async with semaphore:
+            await scratch.insert_one({"id": await dbManager._getNextId(SCRATCH), "n": i})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(insert(i) for i in range(inserts)))
+    rate = inserts / (time.perf_counter() - start)
+    dbManager._reserveIds = reserveIds
+    unique = len(await scratch.distinct("id")) == inserts
+    return rate, reservations, unique
+
+
+async def main(inserts: int, concurrency: int, blockSize: int):
+    dbManager = AsyncDBManager(ConfigManager())
+    await dbManager.connect()
+
+    print(f"{inserts} inserts, {concurrency} concurrent")
+    print(f"{'strategy':>10} {'inserts/s':>10} {'counter trips':>14} {'unique':>7}")
+    for name in ["counter", "block", "snowflake"]:
+        dbManager.idStrategy = createIdStrategy(name, blockSize, workerId=0)
+        rate, reservations, unique = await run(dbManager, inserts, concurrency)
+        print(f"{name:>10} {rate:>10.1f} {reservations:>14} {str(unique):>7}")
+
+    await dbManager.db[SCRATCH].drop()
+    await dbManager.counters.delete_one({"_id": SCRATCH})
+    await dbManager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inserts", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--block-size", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.inserts, args.concurrency, args.block_size))
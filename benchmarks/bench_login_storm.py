@@ -0,0 +1,119 @@
+"""
+Login latency and GET /items latency during a login storm.
+
+A probe requests GET /items at a fixed interval, first alone (baseline) and
+then while `--logins` concurrent logins hit POST /login. Before password
+hashing ran on a thread pool, each login blocked the event loop for the whole
+PBKDF2 computation, so the probe latency grew with the storm; now it should
+stay close to the baseline while logins queue on the hashing pool (see the
+password_hasher queue depth reported by GET /metrics).
+
+The storm comes from one IP: set RATE_LIMIT_LOGIN = off in the configuration of
+the API under test, otherwise most logins are rejected with 429 (counted and
+reported apart, without latency).
+
+Usage (needs the API running on a populated database, see app/utils/initDB.py):
+    python benchmarks/bench_login_storm.py --url http://localhost:8000 --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Tuple
+
+import httpx
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+def report(label: str, samples: list):
+    print(
+        f"{label:>22} {len(samples):>6} {statistics.median(samples):>9.1f} "
+        f"{percentile(samples, 95):>9.1f} {percentile(samples, 99):>9.1f} {max(samples):>9.1f}"
+    )
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> list:
+    """Requests GET /items every `interval` seconds until `stop` is set. Returns latencies (ms)."""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/items", params={"limit": 20})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def storm(
+    client: httpx.AsyncClient, logins: int, concurrency: int, username: str, password: str
+) -> Tuple[list, int]:
+    """
+    Runs `logins` logins, `concurrency` at a time.
+    :return: Latencies (ms) of the successful logins, and the number rate limited (429).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/login", data={"username": username, "password": password})
+            if response.status_code == 429:
+                rejected += 1
+                return
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(login() for _ in range(logins)))
+    return latencies, rejected
+
+
+async def main(url: str, logins: int, concurrency: int, interval: float, baseline: float, username: str, password: str):
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        stop = asyncio.Event()
+        probeTask = asyncio.create_task(probe(client, stop, interval))
+        await asyncio.sleep(baseline)
+        stop.set()
+        baselineLatencies = await probeTask
+
+        stop = asyncio.Event()
+        probeTask = asyncio.create_task(probe(client, stop, interval))
+        start = time.perf_counter()
+        loginLatencies, rejected = await storm(client, logins, concurrency, username, password)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        stormLatencies = await probeTask
+
+        metrics = (await client.get("/metrics")).json()
+
+    print(f"{logins} logins, {concurrency} concurrent: {len(loginLatencies) / elapsed:.1f} logins/s")
+    if rejected:
+        print(f"{rejected} logins rate limited (429): set RATE_LIMIT_LOGIN = off on the API to measure the full storm")
+    print(f"{'latency (ms)':>22} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    if loginLatencies:
+        report("login", loginLatencies)
+    report("GET /items (idle)", baselineLatencies)
+    report("GET /items (storm)", stormLatencies)
+    print(f"password hasher: {metrics.get('password_hasher')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05, help="Seconds between two GET /items probes")
+    parser.add_argument("--baseline", type=float, default=3.0, help="Seconds of probing before the storm")
+    parser.add_argument("--username", default="test")
+    parser.add_argument("--password", default="test")
+    args = parser.parse_args()
+    asyncio.run(main(
+        args.url, args.logins, args.concurrency, args.interval, args.baseline, args.username, args.password
+    ))
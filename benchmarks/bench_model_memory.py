@@ -0,0 +1,118 @@
+"""
+Memory of N worker processes holding the price model at the same time.
+
+Each mode starts --workers processes which load the model, predict titles of
+the training CSV and read every weight page (as a long-running worker
+eventually does). Once all are loaded, each one reports from
+/proc/self/smaps_rollup (Linux only):
+- RSS: resident memory, counting shared pages in full in every process;
+- PSS: shared pages divided between the processes sharing them;
+- private: pages only this process holds.
+Figures are per worker, and "model" columns subtract the process before loading.
+
+Modes: "numpy-copy" reads the exported weights into each process (np.load),
+"numpy-mmap" maps them read-only as the API does, "tensorflow" loads
+saved_model.keras.
+
+Usage (needs the export of price_predictor/export.py, and TensorFlow for that mode):
+    python benchmarks/bench_model_memory.py --workers 4 --modes numpy-copy numpy-mmap tensorflow
+"""
+import argparse
+import csv
+import json
+import pathlib
+import subprocess
+import sys
+from sys import path
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+path.append(str(ROOT))
+
+DATA_PATH = ROOT / "app" / "utils" / "marketing_sample_for_ebay_com-ebay_com_product__20210101_20210331__30k_data.csv"
+
+
+def memoryMb() -> dict:
+    """RSS, PSS and private memory of this process, in MB."""
+    values = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "private": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def worker(mode: str):
+    """Runs in each child process: loads the model, then reports its memory when asked."""
+    import numpy as np
+    from price_predictor.inference import NUMPY_MODEL_DIR, load_model
+    from price_predictor.numpy_runtime import NumpyPriceModel
+
+    with open(DATA_PATH, newline="", encoding="utf-8", errors="ignore") as f:
+        titles = [row["Title"] for row in csv.DictReader(f) if row.get("Title")][:2000]
+    before = memoryMb()
+    if mode == "tensorflow":
+        from price_predictor.inference import predict_prices
+        load_model("tensorflow")
+        predict_prices(titles, "tensorflow")
+    else:
+        model = NumpyPriceModel.load(NUMPY_MODEL_DIR, mmap=mode == "numpy-mmap")
+        model.predict(titles)
+        for array in [model.embedding] + [kernel for kernel, _, _ in model.dense]:
+            float(np.asarray(array, dtype=np.float32).sum())
+    print("ready", flush=True)
+    sys.stdin.readline()  # wait until every worker is loaded
+    after = memoryMb()
+    print(json.dumps({
+        **after,
+        "model_rss": after["rss"] - before["rss"],
+        "model_private": after["private"] - before["private"],
+    }), flush=True)
+
+
+def run(mode: str, workers: int) -> dict:
+    children = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--child", mode],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        for _ in range(workers)
+    ]
+    for child in children:
+        if child.stdout.readline().strip() != "ready":
+            raise RuntimeError(f"A {mode} worker failed to load the model")
+    results = []
+    for child in children:
+        child.stdin.write("\n")
+        child.stdin.flush()
+        results.append(json.loads(child.stdout.readline()))
+        child.wait()
+    return {key: sum(result[key] for result in results) / workers for key in results[0]}
+
+
+def main(modes: list, workers: int):
+    print(f"{workers} workers, MB per worker")
+    print(f"{'mode':>12} {'RSS':>9} {'PSS':>9} {'private':>9} {'model RSS':>10} {'model private':>14}")
+    for mode in modes:
+        result = run(mode, workers)
+        print(
+            f"{mode:>12} {result['rss']:>9.1f} {result['pss']:>9.1f} {result['private']:>9.1f} "
+            f"{result['model_rss']:>10.1f} {result['model_private']:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--modes", nargs="+", default=["numpy-copy", "numpy-mmap"],
+                        choices=["numpy-copy", "numpy-mmap", "tensorflow"])
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        worker(args.child)
+    else:
+        main(args.modes, args.workers)
@@ -0,0 +1,106 @@
+"""
+Price model serving cost: TensorFlow (saved_model.keras) vs the NumPy runtime.
+
+Each backend runs in a fresh process, which reports its startup time (imports,
+model load and first prediction), its resident memory once warmed up, and the
+latency of predict_prices for one title and for a batch of --batch-size titles.
+
+Usage (needs TensorFlow, price_predictor/saved_model.keras and the export of
+price_predictor/export.py):
+    python benchmarks/bench_numpy_inference.py --calls 500 --batch-size 32
+"""
+import argparse
+import csv
+import json
+import pathlib
+import random
+import subprocess
+import sys
+import time
+from sys import path
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+path.append(str(ROOT))
+
+DATA_PATH = ROOT / "app" / "utils" / "marketing_sample_for_ebay_com-ebay_com_product__20210101_20210331__30k_data.csv"
+
+
+def loadTitles(count: int) -> list:
+    with open(DATA_PATH, newline="", encoding="utf-8", errors="ignore") as f:
+        titles = [row["Title"] for row in csv.DictReader(f) if row.get("Title")]
+    return random.Random(0).choices(titles[:2000], k=count)
+
+
+def rssMb() -> float:
+    """Resident memory of this process (Linux), in MB."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+def measure(backend: str, calls: int, batchSize: int) -> dict:
+    """Runs in the child process: measures one backend from a cold start."""
+    titles = loadTitles(calls + batchSize)
+    baseline = rssMb()
+    start = time.perf_counter()
+    from price_predictor.inference import predict_prices
+    predict_prices(titles[:1], backend)
+    startup = time.perf_counter() - start
+
+    single = []
+    for title in titles[:calls]:
+        start = time.perf_counter()
+        predict_prices([title], backend)
+        single.append((time.perf_counter() - start) * 1000)
+    batched = []
+    for i in range(max(calls // 10, 10)):
+        batch = titles[i % calls:i % calls + batchSize]
+        start = time.perf_counter()
+        predict_prices(batch, backend)
+        batched.append((time.perf_counter() - start) * 1000)
+    return {
+        "startup_s": startup,
+        "rss_mb": rssMb(),
+        "model_rss_mb": rssMb() - baseline,
+        "single_p50_ms": percentile(single, 50),
+        "single_p99_ms": percentile(single, 99),
+        "batch_p50_ms": percentile(batched, 50),
+    }
+
+
+def main(backends: list, calls: int, batchSize: int):
+    print(f"{calls} single-title calls, batches of {batchSize}")
+    print(
+        f"{'backend':>12} {'startup s':>10} {'RSS MB':>9} {'+model MB':>10} "
+        f"{'1 p50 ms':>9} {'1 p99 ms':>9} {f'{batchSize} p50 ms':>10}"
+    )
+    for backend in backends:
+        child = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--calls", str(calls), "--batch-size", str(batchSize)],
+            capture_output=True, text=True, check=True
+        )
+        result = json.loads(child.stdout.strip().splitlines()[-1])
+        print(
+            f"{backend:>12} {result['startup_s']:>10.2f} {result['rss_mb']:>9.1f} {result['model_rss_mb']:>10.1f} "
+            f"{result['single_p50_ms']:>9.3f} {result['single_p99_ms']:>9.3f} {result['batch_p50_ms']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["tensorflow", "numpy"])
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(measure(args.child, args.calls, args.batch_size)))
+    else:
+        main(args.backends, args.calls, args.batch_size)
@@ -0,0 +1,92 @@
+"""
+Price prediction throughput and latency with and without micro-batching.
+
+"single" calls predict_price once per request on the event loop, as the
+endpoint did before; "batched" goes through PredictionBatcher, which runs one
+forward pass for the requests collected during --wait-ms (or --batch-size
+distinct titles). Titles are sampled from the training CSV, so some repeat and
+are deduplicated within a batch.
+
+Usage (needs TensorFlow and price_predictor/saved_model.keras):
+    python benchmarks/bench_predict_batching.py --requests 2000 --concurrency 1 8 32 128 --wait-ms 2 5 10
+"""
+import argparse
+import asyncio
+import csv
+import pathlib
+import random
+import time
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from price_predictor.batching import PredictionBatcher
+from price_predictor.inference import predict_price, predict_prices
+
+DATA_PATH = (
+    pathlib.Path(__file__).resolve().parent.parent / "app" / "utils"
+    / "marketing_sample_for_ebay_com-ebay_com_product__20210101_20210331__30k_data.csv"
+)
+
+
+def loadTitles(count: int) -> list:
+    with open(DATA_PATH, newline="", encoding="utf-8", errors="ignore") as f:
+        titles = [row["Title"] for row in csv.DictReader(f) if row.get("Title")]
+    return random.Random(0).choices(titles[:2000], k=count)
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+
+async def run(predict, titles: list, concurrency: int) -> tuple:
+    """Runs one prediction per title, `concurrency` at a time. Returns (req/s, p50 ms, p99 ms)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(title: str):
+        async with semaphore:
+            start = time.perf_counter()
+            await predict(title)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(title) for title in titles))
+    rate = len(titles) / (time.perf_counter() - start)
+    return rate, percentile(latencies, 50), percentile(latencies, 99)
+
+
+async def single(title: str) -> float:
+    return predict_price(title)
+
+
+async def main(requests: int, levels: list, waits: list, batchSize: int):
+    titles = loadTitles(requests)
+    predict_prices(titles[:batchSize])  # load the model and trace the graph once
+
+    print(f"{requests} requests, batch size {batchSize}")
+    print(f"{'concurrency':>12} {'mode':>14} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for concurrency in levels:
+        rate, p50, p99 = await run(single, titles, concurrency)
+        print(f"{concurrency:>12} {'single':>14} {rate:>9.1f} {p50:>9.1f} {p99:>9.1f}")
+        for waitMs in waits:
+            batcher = PredictionBatcher(predict_prices, batchSize, waitMs)
+            rate, p50, p99 = await run(batcher.predict, titles, concurrency)
+            stats = batcher.stats()
+            batcher.shutdown()
+            mode = f"batched {waitMs:g}ms"
+            print(
+                f"{concurrency:>12} {mode:>14} {rate:>9.1f} {p50:>9.1f} {p99:>9.1f}"
+                f"   (avg batch {stats['avg_batch_size']}, {stats['requests'] - stats['titles']} deduped)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=[2, 5, 10])
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.wait_ms, args.batch_size))
@@ -0,0 +1,75 @@
+"""
+Keyword search latency: unanchored $regex filter vs the items_text index.
+
+The regex path is the filter getAvailableItems used before the text index: a
+case-insensitive $regex on name and description, which has to scan every
+document. The text path is the current $text query, optionally sorted by
+relevance. For each keyword the script reports the median latency over
+--repeat runs and the number of documents examined by the query plan.
+
+Usage (needs the 30k-item seed, see app/utils/initDB.py):
+    python benchmarks/bench_text_search.py --repeat 20 watch "iphone case" lego
+"""
+import argparse
+import pathlib
+import statistics
+import time
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from app.core.config_manager import ConfigManager
+from app.core.db.db_manager import DBManager, buildAvailableItemsQuery, buildRelevancePipeline
+from app.core.db.db_model import ItemStatus
+
+
+def regexQuery(keyword: str) -> dict:
+    return {
+        "status": ItemStatus.AVAILABLE.value,
+        "$or": [
+            {"name": {"$regex": keyword, "$options": "i"}},
+            {"description": {"$regex": keyword, "$options": "i"}}
+        ]
+    }
+
+
+def timeIt(fn, repeat: int) -> float:
+    """Median wall time of fn() in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def docsExamined(dbManager: DBManager, query: dict) -> int:
+    plan = dbManager.db.command("explain", {"find": "items", "filter": query}, verbosity="executionStats")
+    return plan["executionStats"]["totalDocsExamined"]
+
+
+def main(keywords: list, repeat: int):
+    dbManager = DBManager(ConfigManager())
+    print(f"Items in collection: {dbManager.items.estimated_document_count()}")
+    print(f"{'keyword':<16} {'hits regex/text':>16} {'regex ms':>9} {'text ms':>9} {'relevance ms':>13} "
+          f"{'examined regex/text':>20}")
+    for keyword in keywords:
+        regex = regexQuery(keyword)
+        text = buildAvailableItemsQuery(keyword=keyword)
+        regexHits = dbManager.items.count_documents(regex)
+        textHits = dbManager.items.count_documents(text)
+        regexMs = timeIt(lambda: list(dbManager.items.find(regex)), repeat)
+        textMs = timeIt(lambda: list(dbManager.items.find(text)), repeat)
+        relevanceMs = timeIt(lambda: list(dbManager.items.aggregate(buildRelevancePipeline(text, limit=50))), repeat)
+        examined = f"{docsExamined(dbManager, regex)}/{docsExamined(dbManager, text)}"
+        print(f"{keyword:<16} {f'{regexHits}/{textHits}':>16} {regexMs:>9.2f} {textMs:>9.2f} {relevanceMs:>13.2f} "
+              f"{examined:>20}")
+    dbManager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("keywords", nargs="*", default=["watch", "iphone case", "lego", "vintage", "nike"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.keywords, args.repeat)
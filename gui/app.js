@@ -4,9 +4,15 @@ const API_BASE = '';
 // State
 let currentUser = null;
 let authToken = null;
+let refreshing = null;
 let selectedItem = null;
 let lastTransactionId = null;
 let selectedRating = 0;
+let itemsCursor = null;
+let usersCursor = null;
+
+// Maximum titles/item IDs per batch prediction request (server PREDICT_MAX_TITLES)
+const PREDICT_BATCH_MAX = 100;
 
 // DOM Elements
 const authSection = document.getElementById('authSection');
@@ -44,7 +50,7 @@ function setupEventListeners() {
     logoutBtn.addEventListener('click', handleLogout);
 
     // Filters
-    document.getElementById('applyFilters').addEventListener('click', loadItems);
+    document.getElementById('applyFilters').addEventListener('click', () => loadItems());
     document.getElementById('clearFilters').addEventListener('click', () => {
         document.getElementById('filterKeyword').value = '';
         document.getElementById('filterMinPrice').value = '';
@@ -52,6 +58,12 @@ function setupEventListeners() {
         loadItems();
     });
 
+    document.getElementById('predictPage').addEventListener('click', predictPagePrices);
+
+    // Pagination
+    document.getElementById('loadMoreItems').addEventListener('click', () => loadItems(true));
+    document.getElementById('loadMoreUsers').addEventListener('click', () => loadUsers(true));
+
     // Modal
     document.querySelector('.close-btn').addEventListener('click', closeModal);
     document.getElementById('buyBtn').addEventListener('click', handlePurchase);
@@ -142,8 +154,7 @@ async function handleLogin(e) {
         }
 
         const data = await response.json();
-        authToken = data.access_token;
-        localStorage.setItem('authToken', authToken);
+        storeTokens(data);
         localStorage.setItem('username', username);
 
         await fetchCurrentUser(username);
@@ -190,7 +201,7 @@ async function handleRegister(e) {
 async function fetchCurrentUser(username) {
     // Use the /me endpoint to get current user info including ID
     try {
-        const response = await fetch(`${API_BASE}/me`, {
+        const response = await authFetch(`${API_BASE}/me`, {
             headers: { 'Authorization': `Bearer ${authToken}` }
         });
         if (response.ok) {
@@ -225,14 +236,67 @@ async function checkStoredAuth() {
 }
 
 function handleLogout() {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (refreshToken) {
+        fetch(`${API_BASE}/token/revoke`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken })
+        }).catch(() => {});
+    }
     authToken = null;
     currentUser = null;
     localStorage.removeItem('authToken');
+    localStorage.removeItem('refreshToken');
     localStorage.removeItem('username');
     localStorage.removeItem('userId');
     showAuthSection();
 }
 
+function storeTokens(data) {
+    authToken = data.access_token;
+    localStorage.setItem('authToken', authToken);
+    localStorage.setItem('refreshToken', data.refresh_token);
+}
+
+// Gets a new access token with the refresh token, instead of asking for the password again
+async function refreshAccessToken() {
+    const refreshToken = localStorage.getItem('refreshToken');
+    if (!refreshToken) return false;
+    // Refresh tokens are single-use: concurrent 401s share one refresh
+    if (!refreshing) {
+        refreshing = (async () => {
+            const response = await fetch(`${API_BASE}/token/refresh`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: refreshToken })
+            });
+            if (!response.ok) return false;
+            storeTokens(await response.json());
+            return true;
+        })().catch(() => false).finally(() => { refreshing = null; });
+    }
+    return refreshing;
+}
+
+// fetch() for authenticated calls: sends the access token and, when it has
+// expired, refreshes it once and retries. Logs out if the session is gone.
+async function authFetch(url, options = {}) {
+    const withToken = () => ({
+        ...options,
+        headers: { ...(options.headers || {}), 'Authorization': `Bearer ${authToken}` }
+    });
+    let response = await fetch(url, withToken());
+    if (response.status === 401) {
+        if (await refreshAccessToken()) {
+            response = await fetch(url, withToken());
+        } else if (currentUser) {
+            handleLogout();
+        }
+    }
+    return response;
+}
+
 function showMainContent() {
     authSection.style.display = 'none';
     mainContent.style.display = 'block';
@@ -259,36 +323,42 @@ function showAuthSection() {
 }
 
 // Items Functions
-async function loadItems() {
+// Loads the first page of items, or the next one when `append` is true
+async function loadItems(append = false) {
     const keyword = document.getElementById('filterKeyword').value;
     const minPrice = document.getElementById('filterMinPrice').value;
     const maxPrice = document.getElementById('filterMaxPrice').value;
+    const loadMoreBtn = document.getElementById('loadMoreItems');
 
     let url = `${API_BASE}/items?`;
-    if (keyword) url += `keyword=${encodeURIComponent(keyword)}&`;
+    if (keyword) url += `keyword=${encodeURIComponent(keyword)}&sort=relevance&`;
     if (minPrice) url += `min_price=${minPrice}&`;
     if (maxPrice) url += `max_price=${maxPrice}&`;
+    if (append && itemsCursor) url += `cursor=${encodeURIComponent(itemsCursor)}&`;
 
-    itemsGrid.innerHTML = '<p class="loading">Loading items...</p>';
+    if (!append) itemsGrid.innerHTML = '<p class="loading">Loading items...</p>';
+    loadMoreBtn.style.display = 'none';
 
     try {
         const response = await fetch(url);
         if (!response.ok) throw new Error('Failed to load items');
 
-        const items = await response.json();
-        renderItems(items);
+        const page = await response.json();
+        itemsCursor = page.next_cursor;
+        renderItems(page.items, append);
+        loadMoreBtn.style.display = itemsCursor ? 'block' : 'none';
     } catch (error) {
         itemsGrid.innerHTML = `<p class="error-msg">${error.message}</p>`;
     }
 }
 
-function renderItems(items) {
-    if (items.length === 0) {
+function renderItems(items, append = false) {
+    if (items.length === 0 && !append) {
         itemsGrid.innerHTML = '<p class="loading">No items available</p>';
         return;
     }
 
-    itemsGrid.innerHTML = items.map(item => `
+    const html = items.map(item => `
         <div class="item-card">
             <div onclick="openItemModal(${item.id}, '${escapeHtml(item.name)}', '${escapeHtml(item.description || '')}', ${item.price}, ${item.owner_id}, '${item.status}')">
                 <h3>${escapeHtml(item.name)}</h3>
@@ -297,13 +367,19 @@ function renderItems(items) {
                 <span class="status ${item.status.toLowerCase()}">${item.status}</span>
             </div>
             <div class="predict-section">
-                <button class="btn btn-predict" onclick="event.stopPropagation(); predictItemPrice(${item.id}, '${escapeHtml(item.name)}')">🔮 Predict AI Price</button>
-                <div class="predict-result" id="predict-result-${item.id}" style="display: none;">
-                    AI Estimate: <span class="predicted-price"></span>
+                <button class="btn btn-predict" onclick="event.stopPropagation(); predictItemPrice(${item.id}, '${escapeHtml(item.name)}')">${item.predicted_price != null ? '🔮 Refresh Prediction' : '🔮 Predict AI Price'}</button>
+                <div class="predict-result" id="predict-result-${item.id}" style="display: ${item.predicted_price != null ? 'block' : 'none'};">
+                    AI Estimate: <span class="predicted-price">${item.predicted_price != null ? `$${parseFloat(item.predicted_price).toFixed(2)}` : ''}</span>
                 </div>
             </div>
         </div>
     `).join('');
+
+    if (append) {
+        itemsGrid.insertAdjacentHTML('beforeend', html);
+    } else {
+        itemsGrid.innerHTML = html;
+    }
 }
 
 function escapeHtml(text) {
@@ -398,7 +474,7 @@ async function handlePurchase() {
             }
         }
 
-        const response = await fetch(`${API_BASE}/purchases`, {
+        const response = await authFetch(`${API_BASE}/purchases`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -446,7 +522,7 @@ async function handleRating() {
     }
 
     try {
-        const response = await fetch(`${API_BASE}/ratings`, {
+        const response = await authFetch(`${API_BASE}/ratings`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -489,7 +565,7 @@ async function handleCreateItem(e) {
     };
 
     try {
-        const response = await fetch(`${API_BASE}/items`, {
+        const response = await authFetch(`${API_BASE}/items`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -512,31 +588,38 @@ async function handleCreateItem(e) {
 }
 
 // Users Functions
-async function loadUsers() {
+// Loads the first page of users, or the next one when `append` is true
+async function loadUsers(append = false) {
     const usersGrid = document.getElementById('usersGrid');
-    usersGrid.innerHTML = '<p class="loading">Loading users...</p>';
+    const loadMoreBtn = document.getElementById('loadMoreUsers');
+    if (!append) usersGrid.innerHTML = '<p class="loading">Loading users...</p>';
+    loadMoreBtn.style.display = 'none';
+
+    let url = `${API_BASE}/users`;
+    if (append && usersCursor) url += `?cursor=${encodeURIComponent(usersCursor)}`;
 
     try {
-        // Fetch all users from the new endpoint
-        const response = await fetch(`${API_BASE}/users`);
+        const response = await fetch(url);
         if (!response.ok) throw new Error('Failed to load users');
 
-        const users = await response.json();
-        renderUsers(users);
+        const page = await response.json();
+        usersCursor = page.next_cursor;
+        renderUsers(page.items, append);
+        loadMoreBtn.style.display = usersCursor ? 'block' : 'none';
     } catch (error) {
         usersGrid.innerHTML = `<p class="error-msg">${error.message}</p>`;
     }
 }
 
-function renderUsers(users) {
+function renderUsers(users, append = false) {
     const usersGrid = document.getElementById('usersGrid');
 
-    if (users.length === 0) {
+    if (users.length === 0 && !append) {
         usersGrid.innerHTML = '<p class="loading">No users found</p>';
         return;
     }
 
-    usersGrid.innerHTML = users.map(user => `
+    const html = users.map(user => `
         <div class="user-card" onclick="openUserModal(${user.id}, '${escapeHtml(user.full_name)}', '${escapeHtml(user.username)}', '${escapeHtml(user.email)}', ${user.rating})">
             <div class="avatar">👤</div>
             <h3>${escapeHtml(user.full_name)}</h3>
@@ -544,6 +627,12 @@ function renderUsers(users) {
             <p class="rating">⭐ ${parseFloat(user.rating).toFixed(1)}</p>
         </div>
     `).join('');
+
+    if (append) {
+        usersGrid.insertAdjacentHTML('beforeend', html);
+    } else {
+        usersGrid.innerHTML = html;
+    }
 }
 
 async function openUserModal(userId, fullName, username, email, rating) {
@@ -560,7 +649,7 @@ async function openUserModal(userId, fullName, username, email, rating) {
         const response = await fetch(`${API_BASE}/items/seller/${userId}`);
         if (!response.ok) throw new Error('Failed to load items');
 
-        const items = await response.json();
+        const { items } = await response.json();
 
         if (items.length === 0) {
             userItemsGrid.innerHTML = '<p class="loading">No items listed</p>';
@@ -596,7 +685,7 @@ async function adminGetUser() {
     }
 
     try {
-        const response = await fetch(`${API_BASE}/users/${userId}`, {
+        const response = await authFetch(`${API_BASE}/users/${userId}`, {
             headers: { 'Authorization': `Bearer ${authToken}` }
         });
         const data = await response.json();
@@ -631,7 +720,7 @@ async function adminDeleteUser() {
     if (!confirm(`Are you sure you want to delete user ${userId}?`)) return;
 
     try {
-        const response = await fetch(`${API_BASE}/users/${userId}`, {
+        const response = await authFetch(`${API_BASE}/users/${userId}`, {
             method: 'DELETE',
             headers: { 'Authorization': `Bearer ${authToken}` }
         });
@@ -678,7 +767,7 @@ async function adminUpdateUser() {
     }
 
     try {
-        const response = await fetch(`${API_BASE}/users/${userId}`, {
+        const response = await authFetch(`${API_BASE}/users/${userId}`, {
             method: 'PUT',
             headers: {
                 'Content-Type': 'application/json',
@@ -712,13 +801,14 @@ async function adminGetItemsBySeller() {
     }
 
     try {
-        const response = await fetch(`${API_BASE}/items/seller/${sellerId}`, {
+        const response = await authFetch(`${API_BASE}/items/seller/${sellerId}`, {
             headers: { 'Authorization': `Bearer ${authToken}` }
         });
         const data = await response.json();
 
         if (response.ok) {
-            resultEl.textContent = `Found ${data.length} items:\n` + JSON.stringify(data, null, 2);
+            const more = data.next_cursor ? ' (first page)' : '';
+            resultEl.textContent = `Found ${data.items.length} items${more}:\n` + JSON.stringify(data.items, null, 2);
             resultEl.style.color = '#51cf66';
         } else {
             resultEl.textContent = data.detail || 'Error fetching items';
@@ -758,7 +848,7 @@ async function adminUpdateItem() {
     }
 
     try {
-        const response = await fetch(`${API_BASE}/items/${itemId}`, {
+        const response = await authFetch(`${API_BASE}/items/${itemId}`, {
             method: 'PUT',
             headers: {
                 'Content-Type': 'application/json',
@@ -813,7 +903,7 @@ async function adminDirectApiCall() {
     }
 
     try {
-        const response = await fetch(`${API_BASE}${endpoint}`, options);
+        const response = await authFetch(`${API_BASE}${endpoint}`, options);
         const data = await response.json();
 
         resultEl.textContent = `Status: ${response.status}\n\n${JSON.stringify(data, null, 2)}`;
@@ -833,7 +923,7 @@ async function predictItemPrice(itemId, itemName) {
     btn.textContent = '🔮 Predicting...';
 
     try {
-        const response = await fetch(`${API_BASE}/api/predict-price`, {
+        const response = await authFetch(`${API_BASE}/api/predict-price`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -846,7 +936,7 @@ async function predictItemPrice(itemId, itemName) {
 
         if (!response.ok) throw new Error(data.detail || 'Prediction failed');
 
-        resultEl.querySelector('.predicted-price').textContent = `$${data.predicted_price.toFixed(2)}`;
+        resultEl.querySelector('.predicted-price').textContent = data.predicted_price != null ? `$${parseFloat(data.predicted_price).toFixed(2)}` : 'No estimate available';
         resultEl.style.display = 'block';
         btn.textContent = '🔮 Refresh Prediction';
     } catch (error) {
@@ -858,3 +948,42 @@ async function predictItemPrice(itemId, itemName) {
     }
 }
 
+// Predict the price of every listed item without an estimate yet, with one request per PREDICT_BATCH_MAX items
+async function predictPagePrices() {
+    const btn = document.getElementById('predictPage');
+    const pending = [...itemsGrid.querySelectorAll('.predict-result')]
+        .filter(el => el.style.display === 'none')
+        .map(el => parseInt(el.id.replace('predict-result-', '')));
+    if (pending.length === 0) return;
+
+    btn.disabled = true;
+    btn.textContent = '🔮 Pricing...';
+
+    try {
+        for (let i = 0; i < pending.length; i += PREDICT_BATCH_MAX) {
+            const response = await authFetch(`${API_BASE}/api/predict-price/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ item_ids: pending.slice(i, i + PREDICT_BATCH_MAX) })
+            });
+            const data = await response.json();
+            if (!response.ok) throw new Error(data.detail || 'Prediction failed');
+
+            data.predictions.forEach(prediction => {
+                const resultEl = document.getElementById(`predict-result-${prediction.item_id}`);
+                // No estimate for this title: the item stays pending for the next run
+                if (!resultEl || prediction.predicted_price == null) return;
+                resultEl.querySelector('.predicted-price').textContent = `$${parseFloat(prediction.predicted_price).toFixed(2)}`;
+                resultEl.style.display = 'block';
+                resultEl.previousElementSibling.textContent = '🔮 Refresh Prediction';
+            });
+        }
+        btn.textContent = '🔮 Price this page';
+        btn.title = '';
+    } catch (error) {
+        btn.textContent = '🔮 Retry pricing';
+        btn.title = error.message;
+    } finally {
+        btn.disabled = false;
+    }
+}
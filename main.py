@@ -1,27 +1,39 @@
 import logging
 import pathlib
-from fastapi import FastAPI, HTTPException, Depends, status
+import time
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Query, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from sys import path
-from typing import List, Optional
+from typing import List, Literal, Optional, Tuple
 
 path.append(str(pathlib.Path(__file__).resolve()))
 
+from app.conf.constant import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.core.config_manager import ConfigManager
 from app.core.log_manager import LogManager
 
-from app.core.db.db_manager import DBManager
+from app.core.db.async_db_manager import AsyncDBManager
+from app.core.db.db_manager import USER_PUBLIC_FIELDS, storedEstimate
 from app.core.db.db_model import User, Item
 from app.core.db.db_schema import (
-    UserCreate, UserUpdate, UserResponse, 
-    ItemCreate, ItemUpdate, ItemResponse,
+    UserCreate, UserUpdate, UserResponse, UserPage,
+    ItemCreate, ItemUpdate, ItemResponse, ItemPage,
     TransactionCreate, TransactionResponse,
-    Token, RatingCreate, RatingResponse
+    Token, RefreshRequest, RatingCreate, RatingResponse,
+    PricePredictionBatchRequest, PricePrediction, PricePredictionBatchResponse
 )
+from app.utils.tools import encodeCursor, decodeCursor
+from app.core.rate_limiter import RateLimit, RateLimiter, createRateLimitBackend, clientIp
+from price_predictor.batching import PredictionBatcher
+from price_predictor.cache import PredictionCache
+from price_predictor.client import InferenceClient, InferenceUnavailable
+from price_predictor.inference import loaded_model_version, predict_prices_versioned, warmup
 from app.core.auth import (
-    get_password_hash, verify_password, 
-    create_access_token, decode_access_token
+    PasswordHasher, create_user_token, get_token_user, token_revocations, TokenUser,
+    create_refresh_token, hash_refresh_token, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 logger = logging.getLogger(__name__)
@@ -42,7 +54,22 @@ class Hello(BaseModel):
     message: str
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await dbManager.connect()
+    readiness["database"] = True
+    # Uvicorn only accepts connections once the startup is done
+    await warmup_model()
+    yield
+    readiness["database"] = False
+    await dbManager.close()
+    password_hasher.shutdown()
+    predict_batcher.shutdown()
+    if inference_client is not None:
+        inference_client.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware to allow GUI requests
 from fastapi.middleware.cors import CORSMiddleware
@@ -71,51 +98,235 @@ async def global_exception_handler(request: Request, exc: Exception):
 # Authentication setup
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    payload = decode_access_token(token)
-    if not payload:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenUser:
+    """
+    Authenticates the request from the token claims alone, without reading the user.
+    Routes needing the full profile fetch it themselves.
+    """
+    user = get_token_user(token)
+    if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    username: str = payload.get("sub")
-    user = dbManager.getUserByUsername(username)
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
     return user
 
+
+def parse_cursor(cursor: Optional[str], by_relevance: bool = False) -> Tuple[Optional[int], Optional[float]]:
+    """
+    Returns the (ID, text score) position after which the requested page starts.
+    Both are None for the first page, the score is only read for relevance-ordered pages.
+    """
+    if cursor is None:
+        return None, None
+    try:
+        position = decodeCursor(cursor)
+        after_id = int(position["id"])
+        after_score = float(position["score"]) if by_relevance else None
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id, after_score
+
+
+def next_cursor(rows: list, limit: int, by_relevance: bool = False) -> Optional[str]:
+    """
+    Returns the cursor of the page following `rows`, or None on the last page.
+    Rows are expected to have been fetched with `limit + 1` to detect a next page.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    position = {"id": last.id}
+    if by_relevance:
+        position["score"] = last.score
+    return encodeCursor(position)
+
+
 # This is for when we will need to store information the database
-dbManager = DBManager(configManager)
+dbManager = AsyncDBManager(configManager)
+password_hasher = PasswordHasher(configManager.getHashWorkers(), configManager.getHashRounds())
+
+
+# State reported by GET /ready. model: "loading", "ready" or "unavailable" (warmup failed)
+readiness = {"database": False, "model": "loading"}
+
+
+# With an inference server, this worker does not load the model unless it falls back
+inference_socket = configManager.getPredictServerSocket()
+inference_client = (
+    InferenceClient(inference_socket, configManager.getPredictServerTimeout()) if inference_socket else None
+)
+PREDICT_SERVER_FALLBACK = configManager.getPredictServerFallback()
+# The numpy backend serves the weights exported by price_predictor/export.py without TensorFlow
+PREDICT_BACKEND = configManager.getPredictBackend()
+
+
+def predict_local(titles: List[str]) -> Tuple[List[float], str]:
+    # The model (and TensorFlow) is loaded by the warmup, or the first prediction if it failed
+    return predict_prices_versioned(titles, PREDICT_BACKEND)
+
+
+def predict_batch(titles: List[str]) -> Tuple[List[float], str]:
+    """Predicts the prices of a list of titles, with the version of the model that predicted them."""
+    if inference_client is None:
+        result = predict_local(titles)
+    else:
+        try:
+            result = inference_client.predictPrices(titles)
+        except InferenceUnavailable as e:
+            if not PREDICT_SERVER_FALLBACK:
+                raise
+            logger.warning(f"{e}, predicting in process")
+            result = predict_local(titles)
+    readiness["model"] = "ready"
+    return result
+
+
+def served_model_version() -> str:
+    """
+    Version of the model that would serve a prediction now, "" while unknown (model not
+    loaded yet, or no answer from the inference server yet).
+    """
+    if inference_client is not None and not inference_client.isDown():
+        # The server may run another backend or model than this checkout
+        return inference_client.modelVersion
+    # Fallback: the model of this worker
+    return loaded_model_version(PREDICT_BACKEND)
+
+
+def warm_model() -> None:
+    if inference_client is not None:
+        # The server warms the model up itself: only check that it answers
+        inference_client.predictPrices(["warmup"])
+        return
+    warmup(PREDICT_BACKEND)
+
+
+async def warmup_model() -> None:
+    """
+    Loads the price model and runs a dummy batch on the inference thread, so the
+    first prediction request does not wait for TensorFlow and the model (with an
+    inference server, checks that it answers instead).
+    A failure (e.g. model not trained yet) is logged: the API serves everything
+    else, and predictions retry loading the model.
+    """
+    start = time.perf_counter()
+    try:
+        await predict_batcher.call(warm_model)
+    except Exception as e:
+        readiness["model"] = "unavailable"
+        logger.warning(f"Price model warmup failed: {e}")
+        return
+    readiness["model"] = "ready"
+    logger.info(f"Price model warmed up in {time.perf_counter() - start:.1f}s")
+
+
+prediction_cache = PredictionCache(
+    configManager.getPredictCachePath(), configManager.getPredictCacheSize(), served_model_version
+)
+# Only the titles missing from the cache reach the model; predictions resolve to (price, model version)
+predict_batcher = PredictionBatcher(
+    prediction_cache.wrap(predict_batch), configManager.getPredictBatchSize(), configManager.getPredictBatchWaitMs()
+)
+
+
+def user_or_ip(request: Request) -> str:
+    """Rate limit key: the authenticated user if the request has a valid token, else the client IP."""
+    authorization = request.headers.get("Authorization", "")
+    if authorization.startswith("Bearer "):
+        user = get_token_user(authorization[len("Bearer "):])
+        if user is not None:
+            return f"user:{user.id}"
+    return clientIp(request)
+
+
+rate_limit_backend = createRateLimitBackend(
+    configManager.getRateLimitBackend(), configManager.getRateLimitPath()
+)
+# Per client limits of the CPU-heavy routes (PBKDF2 verification, model inference)
+login_rate_limit = RateLimiter(
+    rate_limit_backend, "login", RateLimit.parse(configManager.getRateLimit("login"))
+)
+predict_rate_limit = RateLimiter(
+    rate_limit_backend, "predict", RateLimit.parse(configManager.getRateLimit("predict")), keyFunc=user_or_ip
+)
+predict_batch_rate_limit = RateLimiter(
+    rate_limit_backend, "predict_batch", RateLimit.parse(configManager.getRateLimit("predict_batch")), keyFunc=user_or_ip
+)
+PREDICT_MAX_TITLES = configManager.getPredictMaxTitles()
 logger.info("DB manager init succesful")
 
 
 @app.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
+async def get_me(current_user: TokenUser = Depends(get_current_user)):
     """
     Returns the authenticated user's profile information.
     """
-    return current_user
+    user = await dbManager.getUserById(current_user.id, USER_PUBLIC_FIELDS)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
 
 
 
 
 
-@app.post("/login", response_model=Token)
+@app.post("/login", response_model=Token, dependencies=[Depends(login_rate_limit)])
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticates a user and returns a JWT access token.
     Accepts standard OAuth2 password form (username/password).
     """
-    user = dbManager.getUserByUsername(form_data.username)
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await dbManager.getUserByUsername(form_data.username)
+    if not user or not await password_hasher.verify(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = create_access_token(data={"sub": user.username})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return await issue_tokens(user.id, user.username, family=uuid.uuid4().hex)
+
+
+@app.post("/token/refresh", response_model=Token)
+async def refresh_token(payload: RefreshRequest):
+    """
+    Exchanges a refresh token for a new access token and a new refresh token.
+    Refresh tokens are single-use: the presented one is consumed, and presenting
+    it again revokes every token rotated from the same login.
+    """
+    token = await dbManager.useRefreshToken(hash_refresh_token(payload.refresh_token))
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await issue_tokens(token["user_id"], token["username"], family=token["family"])
+
+
+@app.post("/token/revoke")
+async def revoke_token(payload: RefreshRequest):
+    """
+    Logs a session out: revokes the refresh token and all tokens rotated from the same login.
+    """
+    token = await dbManager.useRefreshToken(hash_refresh_token(payload.refresh_token))
+    if token is not None:
+        await dbManager.revokeRefreshTokens(family=token["family"])
+    return {"message": "Refresh token revoked"}
+
+
+async def issue_tokens(user_id: int, username: str, family: str) -> dict:
+    """Creates an access token and stores a new refresh token of the given family."""
+    refresh, refresh_hash, expires_at = create_refresh_token()
+    if not await dbManager.insertRefreshToken(refresh_hash, user_id, username, family, expires_at):
+        raise HTTPException(status_code=500, detail="Could not create refresh token")
+    return {
+        "access_token": create_user_token(user_id, username),
+        "token_type": "bearer",
+        "refresh_token": refresh,
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
 
 
 @app.post("/users", response_model=UserResponse)
@@ -125,35 +336,39 @@ async def create_user(user_in: UserCreate):
     Hashes the password before storage.
     """
     # Check if user already exists
-    if dbManager.getUserByUsername(user_in.username):
+    if await dbManager.getUserByUsername(user_in.username, {"_id": 1}):
         raise HTTPException(status_code=400, detail="Username already registered")
     
     user = User(
         full_name=user_in.full_name,
         username=user_in.username,
         email=user_in.email,
-        password_hash=get_password_hash(user_in.password)
+        password_hash=await password_hasher.hash(user_in.password)
     )
-    if dbManager.insertRow(user):
-        new_user = dbManager.getUserByUsername(user_in.username)
-        if new_user:
-            return new_user
+    new_user = await dbManager.insertRow(user)
+    if new_user:
+        return UserResponse.model_validate(new_user)
     raise HTTPException(status_code=400, detail="User could not be created")
 
 
-@app.get("/users", response_model=List[UserResponse])
-async def get_all_users():
+@app.get("/users", response_model=UserPage)
+async def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """
-    Retrieves a list of all users.
+    Retrieves users ordered by ID, one page at a time.
+    Pass the returned `next_cursor` as `cursor` to get the following page.
     """
     import traceback
+    after_id, _ = parse_cursor(cursor)
     try:
-        users = dbManager.getRows(User)
+        users = await dbManager.getUsers(limit=limit + 1, after_id=after_id)
         logger.info(f"Got {len(users)} users from DB")
         # Explicitly convert to response model for proper serialization
-        result = [UserResponse.model_validate(u) for u in users]
+        result = [UserResponse.model_validate(u) for u in users[:limit]]
         logger.info(f"Converted {len(result)} users to UserResponse")
-        return result
+        return UserPage(items=result, next_cursor=next_cursor(users, limit))
     except Exception as e:
         logger.error(f"Error in get_all_users: {e}")
         logger.error(traceback.format_exc())
@@ -165,7 +380,7 @@ async def get_user(user_id: int):
     """
     Retrieves public profile information for a specific user.
     """
-    user = dbManager.getUserById(user_id)
+    user = await dbManager.getUserById(user_id, USER_PUBLIC_FIELDS)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return UserResponse.model_validate(user)
@@ -175,134 +390,188 @@ async def get_user(user_id: int):
 async def update_user(
     user_id: int, 
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_user)
 ):
     """
     Updates a user's profile.
     Users can update their own profile, admin can update any user.
     """
     # Allow admin to update any user
-    if user_id != current_user.id and current_user.username != 'admin':
+    if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to update this user")
         
     update_data = user_in.model_dump(exclude_unset=True)
     if "password" in update_data:
-        update_data["password_hash"] = get_password_hash(update_data.pop("password"))
+        update_data["password_hash"] = await password_hasher.hash(update_data.pop("password"))
     
-    updated_user = dbManager.updateUser(user_id, update_data)
+    updated_user = await dbManager.updateUser(user_id, update_data)
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found or update failed")
+    # Tokens carry the username: renamed users and new passwords need a new login
+    if "username" in update_data or "password_hash" in update_data:
+        token_revocations.revokeUser(user_id)
+        await dbManager.revokeRefreshTokens(user_id=user_id)
     return UserResponse.model_validate(updated_user)
 
 
 @app.delete("/users/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_user)
 ):
     """
     Deletes a user's profile.
     Users can delete their own profile, admin can delete any user.
     """
     # Allow admin to delete any user
-    if user_id != current_user.id and current_user.username != 'admin':
+    if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to delete this user")
         
-    if dbManager.deleteUserById(user_id):
+    if await dbManager.deleteUserById(user_id):
+        token_revocations.revokeUser(user_id)
+        await dbManager.revokeRefreshTokens(user_id=user_id)
         return {"message": "User deleted successfully"}
     raise HTTPException(status_code=404, detail="User not found")
 
 
+async def estimate_price(name: str) -> Tuple[Optional[float], Optional[str]]:
+    """
+    Predicts the price estimate stored on an item with this name.
+    :return: (predicted_price, model_version), (None, None) if the model is unavailable:
+        the item is then scored later by app/utils/scoreItems.py.
+    """
+    try:
+        # The version of the model that produced this price (cached or predicted)
+        price, version = await predict_batcher.predict(name)
+    except Exception as e:
+        logger.warning(f"Unable to estimate the price of '{name}': {e}")
+        return None, None
+    return storedEstimate(price), version or None
+
+
 @app.post("/items", response_model=ItemResponse)
 async def create_item(
     item_in: ItemCreate, 
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_user)
 ):
     """
     Lists a new item for sale.
     The item is automatically assigned to the authenticated user.
     """
     from app.core.db.db_model import ItemStatus
+    # The seller rating is copied onto the item, it is not part of the token
+    owner = await dbManager.getUserById(current_user.id, USER_PUBLIC_FIELDS)
+    if owner is None:
+        raise HTTPException(status_code=404, detail="User not found")
     item = Item(
         name=item_in.name,
         description=item_in.description,
         price=item_in.price,
         status=ItemStatus(item_in.status.value),
-        owner_id=current_user.id  # Use authenticated user ID
+        owner_id=current_user.id,  # Use authenticated user ID
+        seller_rating=owner.rating
     )
-    if dbManager.insertRow(item):
-        # Find the item back to get ID (simple lookup by name and owner for this lab)
-        all_items = dbManager.getRows(Item)
-        for i in reversed(all_items):
-            if i.name == item_in.name and i.owner_id == current_user.id:
-                return ItemResponse.model_validate(i)
+    item.predicted_price, item.model_version = await estimate_price(item.name)
+    new_item = await dbManager.insertRow(item)
+    if new_item:
+        return ItemResponse.model_validate(new_item)
     raise HTTPException(status_code=400, detail="Item could not be created")
 
 
-@app.get("/items", response_model=List[ItemResponse])
+@app.get("/items", response_model=ItemPage)
 async def get_available_items(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     keyword: Optional[str] = None,
-    min_seller_rating: Optional[float] = None
+    min_seller_rating: Optional[float] = None,
+    sort: Literal["id", "relevance"] = "id",
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
 ):
     """
-    Lists all available items with optional filtering.
-    Filters: Price range, keyword in name/description, and minimum seller reputation.
+    Lists available items with optional filtering, one page at a time.
+    Filters: Price range, keyword in name/description (full-text search), and minimum seller reputation.
+    `sort=relevance` orders keyword matches by decreasing relevance instead of ID.
+    Pass the returned `next_cursor` as `cursor` to get the following page.
     """
-    items = dbManager.getAvailableItems(
+    by_relevance = sort == "relevance" and bool(keyword)
+    after_id, after_score = parse_cursor(cursor, by_relevance)
+    items = await dbManager.getAvailableItems(
         min_price=min_price, 
         max_price=max_price, 
         keyword=keyword, 
-        min_seller_rating=min_seller_rating
+        min_seller_rating=min_seller_rating,
+        limit=limit + 1,
+        after_id=after_id,
+        sort_by_relevance=by_relevance,
+        after_score=after_score
+    )
+    return ItemPage(
+        items=[ItemResponse.model_validate(i) for i in items[:limit]],
+        next_cursor=next_cursor(items, limit, by_relevance)
     )
-    return [ItemResponse.model_validate(i) for i in items]
 
 
-@app.get("/items/seller/{seller_id}", response_model=List[ItemResponse])
-async def get_items_by_seller(seller_id: int):
+@app.get("/items/seller/{seller_id}", response_model=ItemPage)
+async def get_items_by_seller(
+    seller_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """
-    Retrieves all items (regardless of status) owned by a specific seller.
+    Retrieves the items (regardless of status) owned by a specific seller, one page at a time.
     """
-    items = dbManager.getItemsBySeller(seller_id)
-    return [ItemResponse.model_validate(i) for i in items]
+    after_id, _ = parse_cursor(cursor)
+    items = await dbManager.getItemsBySeller(seller_id, limit=limit + 1, after_id=after_id)
+    return ItemPage(
+        items=[ItemResponse.model_validate(i) for i in items[:limit]],
+        next_cursor=next_cursor(items, limit)
+    )
 
 
 @app.put("/items/{item_id}", response_model=ItemResponse)
 async def update_item(
     item_id: int, 
     item_in: ItemUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_user)
 ):
     """
     Updates an existing item's details.
     Owner can update their items, admin can update any item.
     """
-    # Check if item exists and belongs to user
-    existing_item = dbManager.getRows(Item) # Need a better way but let's filter
-    target_item = None
-    for i in existing_item:
-        if i.id == item_id:
-            target_item = i
-            break
-    
-    if not target_item:
+    update_data = item_in.model_dump(exclude_unset=True)
+    # Allow admin to update any item, others only the items they own
+    owner_id = None if current_user.is_admin else current_user.id
+    if update_data.get("name"):
+        # Estimating the new name runs the model: only do it for an item the user may update
+        await check_item_owner(item_id, owner_id)
+        # The stored estimate follows the name
+        update_data["predicted_price"], update_data["model_version"] = await estimate_price(update_data["name"])
+    updated_item = await dbManager.updateItem(item_id, update_data, owner_id=owner_id)
+    if updated_item:
+        return ItemResponse.model_validate(updated_item)
+
+    # Nothing updated: tell a missing item from someone else's item
+    await check_item_owner(item_id, owner_id)
+    raise HTTPException(status_code=400, detail="Update failed")
+
+
+async def check_item_owner(item_id: int, owner_id: Optional[int]) -> None:
+    """
+    Raises 404 if the item does not exist, 403 if it does not belong to `owner_id`
+    (None: any owner, for admins).
+    """
+    existing_item = await dbManager.getItemById(item_id, {"_id": 0, "owner_id": 1})
+    if not existing_item:
         raise HTTPException(status_code=404, detail="Item not found")
-    # Allow admin to update any item
-    if target_item.owner_id != current_user.id and current_user.username != 'admin':
+    if owner_id is not None and existing_item.owner_id != owner_id:
         raise HTTPException(status_code=403, detail="Not authorized to update this item")
 
-    update_data = item_in.model_dump(exclude_unset=True)
-    updated_item = dbManager.updateItem(item_id, update_data)
-    if not updated_item:
-        raise HTTPException(status_code=400, detail="Update failed")
-    return ItemResponse.model_validate(updated_item)
-
 
 @app.post("/purchases", response_model=TransactionResponse)
 async def purchase_item(
     transaction_in: TransactionCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_user)
 ):
     """
     Processes a purchase for an available item.
@@ -314,7 +583,7 @@ async def purchase_item(
     if transaction_in.buyer_id != current_user.id:
         raise HTTPException(status_code=403, detail="Buyer ID must match authenticated user")
 
-    transaction = dbManager.purchaseItem(
+    transaction = await dbManager.purchaseItem(
         buyer_id=current_user.id,
         item_id=transaction_in.item_id
     )
@@ -330,7 +599,7 @@ async def purchase_item(
 @app.post("/ratings", response_model=RatingResponse)
 async def rate_seller(
     rating_in: RatingCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: TokenUser = Depends(get_current_user)
 ):
     """
     Submit a rating for a seller after a successful transaction.
@@ -341,7 +610,7 @@ async def rate_seller(
     if rating_in.score < 1 or rating_in.score > 5:
         raise HTTPException(status_code=400, detail="Score must be between 1 and 5")
     
-    rating = dbManager.rateSeller(
+    rating = await dbManager.rateSeller(
         rater_id=current_user.id,
         transaction_id=rating_in.transaction_id,
         score=rating_in.score
@@ -354,21 +623,96 @@ async def rate_seller(
     return RatingResponse.model_validate(rating)
 
 
-@app.post("/api/predict-price")
+@app.get("/ready")
+async def get_readiness():
+    """
+    Readiness probe: 200 once the database is connected and the price model is
+    loaded and warmed up, 503 otherwise. The body reports the state of each.
+    """
+    ready = readiness["database"] and readiness["model"] == "ready"
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"ready": ready, **readiness},
+    )
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Runtime counters of this worker process.
+    - entity_cache: hits, misses and size of the user/item lookup cache.
+    - password_hasher: queue depth and activity of the password hashing pool.
+    - rate_limited: requests rejected with a 429, per route.
+    - predict_batcher: price predictions and the forward passes serving them.
+    - prediction_cache: hits of the in-memory and on-disk prediction cache, and misses.
+    - inference_server: requests and failures of the inference server client (when configured).
+    """
+    return {
+        "entity_cache": dbManager.cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "predict_batcher": predict_batcher.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "inference_server": inference_client.stats() if inference_client is not None else None,
+        "rate_limited": {
+            limiter.route: limiter.rejected
+            for limiter in (login_rate_limit, predict_rate_limit, predict_batch_rate_limit)
+        },
+    }
+
+
+@app.post("/api/predict-price", dependencies=[Depends(predict_rate_limit)])
 async def predict_price_endpoint(payload: dict):
     title = payload.get("title")
     if not title:
         raise HTTPException(status_code=400, detail="Title is required")
     
+    # In-memory hits skip the batching window
+    predicted_price = prediction_cache.peek(title)
+    if predicted_price is not None:
+        return {"predicted_price": predicted_price}
     try:
-        from price_predictor.inference import predict_price
-        predicted_price = predict_price(title)
+        predicted_price, _ = await predict_batcher.predict(title)
         return {"predicted_price": predicted_price}
     except Exception as e:
         logger.error(f"Prediction failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post(
+    "/api/predict-price/batch",
+    response_model=PricePredictionBatchResponse,
+    dependencies=[Depends(predict_batch_rate_limit)]
+)
+async def predict_price_batch_endpoint(payload: PricePredictionBatchRequest):
+    """
+    Predicts the prices of several titles and/or items (by ID, using their name) with one forward pass.
+    Unknown item IDs are reported in `missing_item_ids`.
+    """
+    if not payload.titles and not payload.item_ids:
+        raise HTTPException(status_code=400, detail="Titles or item IDs are required")
+    if len(payload.titles) + len(payload.item_ids) > PREDICT_MAX_TITLES:
+        raise HTTPException(status_code=400, detail=f"At most {PREDICT_MAX_TITLES} titles and item IDs per request")
+    if any(not title for title in payload.titles):
+        raise HTTPException(status_code=400, detail="Titles must not be empty")
+
+    items = await dbManager.getItemsByIds(payload.item_ids, {"_id": 0, "id": 1, "name": 1}) if payload.item_ids else []
+    found = {item.id for item in items}
+    requested = [(title, None) for title in payload.titles] + [(item.name, item.id) for item in items]
+
+    try:
+        predictions = await predict_batcher.predictMany([title for title, _ in requested])
+    except Exception as e:
+        logger.error(f"Batch prediction failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return PricePredictionBatchResponse(
+        predictions=[
+            PricePrediction(title=title, item_id=item_id, predicted_price=price)
+            for (title, item_id), (price, _) in zip(requested, predictions)
+        ],
+        missing_item_ids=[item_id for item_id in dict.fromkeys(payload.item_ids) if item_id not in found]
+    )
+
+
 
 # Static files mount - MUST be at the end to not intercept API routes
 # Reload trigger
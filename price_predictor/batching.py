@@ -0,0 +1,117 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+
+
+class PredictionBatcher:
+    """
+    Collects concurrent price predictions and runs them as one batched forward pass.
+
+    The first title of a batch starts a timer of `maxWaitMs`; the batch is run when
+    the timer fires or as soon as it holds `maxBatchSize` distinct titles. Identical
+    titles within a batch are predicted once and their result is handed to every
+    waiter. A longer wait or a larger batch raises throughput under load at the cost
+    of latency; `maxWaitMs=0` only batches requests arriving in the same loop turn.
+
+    The forward pass runs on a single background thread, so the event loop keeps
+    serving requests (and filling the next batch) during inference.
+    """
+
+    def __init__(
+        self,
+        predictBatch: Callable[[List[str]], List[float]],
+        maxBatchSize: int = 32,
+        maxWaitMs: float = 5.0
+    ):
+        """
+        :param predictBatch: Predicts the prices of a list of titles, in order.
+        :param maxBatchSize: Maximum number of distinct titles per forward pass.
+        :param maxWaitMs: Maximum time a title waits for others before its batch is run.
+        """
+        self.predictBatch = predictBatch
+        self.maxBatchSize = maxBatchSize
+        self.maxWaitMs = maxWaitMs
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The event loop only keeps weak references to tasks: hold the running batches
+        self._tasks: Set[asyncio.Task] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-predictor")
+        self.batches = 0
+        self.titles = 0
+        self.requests = 0
+
+    async def predict(self, title: str) -> float:
+        """Predicts the price of one title, batched with the concurrent calls."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiters = self._pending.setdefault(title, [])
+        waiters.append(future)
+        self.requests += 1
+
+        if len(self._pending) >= self.maxBatchSize:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.maxWaitMs / 1000, self._flush)
+        return await future
+
+    async def predictMany(self, titles: List[str]) -> List[float]:
+        """
+        Predicts the prices of a list of titles with one forward pass, outside the
+        batching queue (the caller already batched them). Duplicates are predicted once.
+        """
+        distinct = list(dict.fromkeys(titles))
+        self.requests += len(titles)
+        self.titles += len(distinct)
+        self.batches += 1
+        loop = asyncio.get_running_loop()
+        prices = dict(zip(distinct, await loop.run_in_executor(self._executor, self.predictBatch, distinct)))
+        return [prices[title] for title in titles]
+
+    async def call(self, func: Callable[[], object]) -> object:
+        """Runs `func` on the inference thread, e.g. to load the model before the first batch."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func)
+
+    def _flush(self) -> None:
+        """Starts the forward pass of the pending titles."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        self.batches += 1
+        self.titles += len(batch)
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, List[asyncio.Future]]) -> None:
+        titles = list(batch)
+        try:
+            prices = await asyncio.get_running_loop().run_in_executor(self._executor, self.predictBatch, titles)
+        except Exception as e:
+            for waiters in batch.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for title, price in zip(titles, prices):
+            for future in batch[title]:
+                # A waiter may have been cancelled (client gone)
+                if not future.done():
+                    future.set_result(price)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the batching counters: requests, distinct titles predicted and forward passes."""
+        return {
+            "max_batch_size": self.maxBatchSize,
+            "max_wait_ms": self.maxWaitMs,
+            "requests": self.requests,
+            "titles": self.titles,
+            "batches": self.batches,
+            "avg_batch_size": round(self.titles / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """Stops the inference thread once the running batch is done."""
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from price_predictor.numpy_runtime import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_title(title: str) -> str:
+    """
+    Reduces a title to what the model sees: lowercase, no punctuation, single spaces.
+    Titles with the same normalized form always get the same prediction.
+    """
+    return " ".join(tokenize(title))
+
+
+def file_version(path: str) -> str:
+    """Returns the SHA-256 digest of a file (the model version)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    Two-tier cache of price predictions: an in-memory LRU in front of a SQLite file
+    that survives restarts and is shared by the workers of a host.
+    Entries are keyed by normalized title and model version: the version of the model
+    that predicted them, as reported by whatever served the prediction (the model
+    loaded in this process or the inference server), never read from the model file
+    on disk. A new model misses every old entry, and when this process first meets a
+    new version, the entries of the versions it has not served are purged from the file.
+    """
+
+    def __init__(self, path: Optional[str], maxSize: int = 10000, versionFunc: Callable[[], str] = lambda: ""):
+        """
+        :param path: SQLite file of the persistent tier, None for memory only.
+        :param maxSize: Entries of the in-memory tier.
+        :param versionFunc: Returns the version of the model that would serve a prediction
+            now, "" if unknown yet (model not loaded): lookups then miss. Must not block.
+        """
+        self.path = path
+        self.maxSize = maxSize
+        self.versionFunc = versionFunc
+        self._memory: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Versions served by this process, kept when purging the file
+        self._versions: Set[str] = set()
+        self.memoryHits = 0
+        self.diskHits = 0
+        self.misses = 0
+        if path:
+            self._connect().execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "model_version TEXT NOT NULL, title TEXT NOT NULL, price REAL NOT NULL, "
+                "PRIMARY KEY (model_version, title))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def modelVersion(self) -> str:
+        """Returns the version of the model that would serve a prediction now ("" if unknown)."""
+        version = self.versionFunc()
+        if version:
+            self._adopt(version)
+        return version
+
+    def _adopt(self, version: str) -> None:
+        """Records a version served by this process; the first time, purges the entries of the others."""
+        with self._lock:
+            if version in self._versions:
+                return
+            self._versions.add(version)
+            versions = list(self._versions)
+        if self.path:
+            with self._connect() as connection:
+                connection.execute(
+                    f"DELETE FROM predictions WHERE model_version NOT IN ({','.join('?' * len(versions))})", versions
+                )
+
+    def peek(self, title: str) -> Optional[float]:
+        """Looks a title up in the in-memory tier only (no I/O)."""
+        version = self.modelVersion()
+        if not version:
+            return None
+        key = (version, normalize_title(title))
+        with self._lock:
+            price = self._memory.get(key)
+            if price is not None:
+                self._memory.move_to_end(key)
+                self.memoryHits += 1
+            return price
+
+    def lookup(self, titles: List[str]) -> Tuple[Dict[str, float], str]:
+        """
+        Looks titles up in both tiers, for the current model version.
+        :return: The prices found, by (original) title, and the version they belong to.
+        """
+        version = self.modelVersion()
+        if not version:
+            self.misses += len(titles)
+            return {}, version
+        found: Dict[str, float] = {}
+        missing: Dict[str, List[str]] = {}  # normalized -> titles
+        with self._lock:
+            for title in titles:
+                normalized = normalize_title(title)
+                price = self._memory.get((version, normalized))
+                if price is None:
+                    missing.setdefault(normalized, []).append(title)
+                    continue
+                self._memory.move_to_end((version, normalized))
+                self.memoryHits += 1
+                found[title] = price
+
+        if missing and self.path:
+            normalized = list(missing)
+            rows = self._connect().execute(
+                f"SELECT title, price FROM predictions WHERE model_version = ? AND title IN ({','.join('?' * len(normalized))})",
+                [version] + normalized
+            ).fetchall()
+            self._remember(version, dict(rows))
+            for title, price in rows:
+                for original in missing.pop(title):
+                    found[original] = price
+                    self.diskHits += 1
+        self.misses += sum(len(originals) for originals in missing.values())
+        return found, version
+
+    def store(self, prices: Dict[str, float], version: str) -> None:
+        """
+        Caches freshly predicted prices, by (original) title, in both tiers.
+        Non-finite prices (NaN for titles without any token) are not cached.
+        :param version: Version of the model that predicted them.
+        """
+        if not version:
+            return
+        self._adopt(version)
+        normalized = {
+            normalize_title(title): price for title, price in prices.items() if math.isfinite(price)
+        }
+        if not normalized:
+            return
+        self._remember(version, normalized)
+        if self.path:
+            with self._connect() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO predictions (model_version, title, price) VALUES (?, ?, ?)",
+                    [(version, title, price) for title, price in normalized.items()]
+                )
+
+    def _remember(self, version: str, prices: Dict[str, float]) -> None:
+        if self.maxSize <= 0:
+            return
+        with self._lock:
+            for title, price in prices.items():
+                self._memory[(version, title)] = price
+                self._memory.move_to_end((version, title))
+            while len(self._memory) > self.maxSize:
+                self._memory.popitem(last=False)
+
+    def wrap(
+        self, predictBatch: Callable[[List[str]], Tuple[List[float], str]]
+    ) -> Callable[[List[str]], List[Tuple[float, str]]]:
+        """
+        Returns a batch prediction function that only runs `predictBatch` on cache misses.
+        :param predictBatch: Predicts the prices of a list of titles, in order, and returns
+            them with the version of the model that predicted them.
+        :return: A function returning the (price, model version) of each title, in order.
+        """
+        def cachedPredictBatch(titles: List[str]) -> List[Tuple[float, str]]:
+            cached, cachedVersion = self.lookup(titles)
+            results = {title: (price, cachedVersion) for title, price in cached.items()}
+            # One forward pass per normalized title
+            missing: Dict[str, str] = {}
+            for title in titles:
+                if title not in results:
+                    missing.setdefault(normalize_title(title), title)
+            if missing:
+                prices, version = predictBatch(list(missing.values()))
+                predicted = dict(zip(missing.values(), prices))
+                try:
+                    self.store(predicted, version)
+                except Exception as e:
+                    # The predictions are still valid without the cache
+                    logger.warning(f"Unable to cache {len(predicted)} predictions with exception {e}")
+                byNormalized = {normalized: predicted[title] for normalized, title in missing.items()}
+                for title in titles:
+                    if title not in results:
+                        results[title] = (byNormalized[normalize_title(title)], version)
+            return [results[title] for title in titles]
+        return cachedPredictBatch
+
+    def stats(self) -> Dict[str, object]:
+        """Returns the hit counters of both tiers and the size of the in-memory tier."""
+        with self._lock:
+            return {
+                "model_version": self.versionFunc()[:12],
+                "size": len(self._memory),
+                "max_size": self.maxSize,
+                "memory_hits": self.memoryHits,
+                "disk_hits": self.diskHits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,115 @@
+import json
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class InferenceUnavailable(Exception):
+    """The inference server could not be reached or did not answer in time."""
+
+
+class InferenceClient:
+    """
+    Client of the inference server (price_predictor/server.py), used in place of an
+    in-process model. Blocking: it is called from the prediction thread, never from
+    the event loop.
+
+    A connection is kept open between calls. When the server cannot be reached or
+    times out, the call raises InferenceUnavailable and the server is not tried
+    again for `retryAfter` seconds, so callers can fall back without each batch
+    waiting for the timeout.
+    """
+
+    def __init__(self, socketPath: str, timeout: float = 2.0, retryAfter: float = 5.0):
+        """
+        :param socketPath: Unix socket of the inference server.
+        :param timeout: Seconds allowed to connect and to get each response.
+        :param retryAfter: Seconds during which the server is not tried after a failure.
+        """
+        self.socketPath = socketPath
+        self.timeout = timeout
+        self.retryAfter = retryAfter
+        self._lock = threading.Lock()
+        self._socket: Optional[socket.socket] = None
+        self._stream = None
+        self._downUntil = 0.0
+        # Version of the model of the server, from its last answer ("" before the first one)
+        self.modelVersion = ""
+        self.requests = 0
+        self.failures = 0
+
+    def _connect(self):
+        if self._socket is None:
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.settimeout(self.timeout)
+            try:
+                connection.connect(self.socketPath)
+            except OSError:
+                connection.close()
+                raise
+            self._socket, self._stream = connection, connection.makefile("rb")
+        return self._socket, self._stream
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            self._stream.close()
+            self._socket.close()
+            self._socket = self._stream = None
+
+    def _send(self, request: bytes) -> Dict[str, object]:
+        connection, stream = self._connect()
+        connection.sendall(request)
+        line = stream.readline()
+        if not line:
+            raise EOFError("Connection closed by the inference server")
+        return json.loads(line)
+
+    def predictPrices(self, titles: List[str]) -> Tuple[List[float], str]:
+        """
+        Predicts the prices of a list of titles, in order, on the inference server.
+        :return: The prices, and the version of the model the server predicted them with.
+        :raises InferenceUnavailable: if the server is down, unreachable or too slow.
+        :raises RuntimeError: if the server failed to predict.
+        """
+        with self._lock:
+            if self.isDown():
+                raise InferenceUnavailable("Inference server marked down after a failure")
+            self.requests += 1
+            request = json.dumps({"titles": titles}).encode() + b"\n"
+            try:
+                try:
+                    response = self._send(request)
+                except (ConnectionError, EOFError):
+                    # The kept connection may predate a server restart: retry once on a new one
+                    self._close()
+                    response = self._send(request)
+            except (OSError, ValueError, EOFError) as e:
+                # socket.timeout is an OSError; a late answer would desync the connection
+                self._close()
+                self.failures += 1
+                self._downUntil = time.monotonic() + self.retryAfter
+                raise InferenceUnavailable(f"Inference server {self.socketPath}: {e}") from e
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        self.modelVersion = response.get("version", "")
+        return response["prices"], self.modelVersion
+
+    def stats(self) -> Dict[str, object]:
+        """Returns the request and failure counters, and whether the server is marked down."""
+        return {
+            "socket": self.socketPath,
+            "requests": self.requests,
+            "failures": self.failures,
+            "down": self.isDown(),
+            "model_version": self.modelVersion[:12],
+        }
+
+    def isDown(self) -> bool:
+        """Whether the server is marked down after a failure (not tried until retryAfter elapsed)."""
+        return time.monotonic() < self._downUntil
+
+    def close(self) -> None:
+        """Closes the connection to the server."""
+        with self._lock:
+            self._close()
@@ -0,0 +1,159 @@
+"""
+Exports saved_model.keras for the NumPy runtime (numpy_runtime.py): the
+vocabulary, the embedding table and the Dense weights, as plain .npy files.
+
+The export is then checked against the Keras model on titles of the training
+CSV (plus edge cases): the script fails if any prediction differs by more than
+the tolerance. Re-run it after every training.
+
+--embedding float16 or int8 compresses the embedding table, which holds most of
+the weights. Their predictions are only reported, not checked: pick a mode with
+benchmarks/bench_embedding_quantization.py.
+
+Usage (needs TensorFlow):
+    python price_predictor/export.py --output price_predictor/numpy_model --check 2000 --embedding float32
+"""
+import argparse
+import csv
+import json
+import os
+import pathlib
+from sys import path
+
+import numpy as np
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from price_predictor.cache import file_version
+from price_predictor.inference import MODEL_PATH, NUMPY_MODEL_DIR
+from price_predictor.numpy_runtime import (
+    ACTIVATIONS, CONFIG_FILE, EMBEDDING_MODES, VOCABULARY_FILE, NumpyPriceModel, quantize_embedding
+)
+
+DATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app', 'utils',
+    'marketing_sample_for_ebay_com-ebay_com_product__20210101_20210331__30k_data.csv'
+)
+EDGE_CASES = [
+    "Gold Rolex Watch",
+    "GOLD rolex, WATCH!!!",
+    "  apple   iphone\t12 pro-max 128GB  ",
+    "zzqx unknownword vintage",
+    "Café ÉCLAIR Montre Ünïque — 10\u00a0pcs",
+    "one two three four five six seven eight nine ten eleven twelve thirteen fourteen "
+    "fifteen sixteen seventeen eighteen nineteen twenty twentyone twentytwo",
+]
+
+
+def write_atomically(path: str, write) -> None:
+    """
+    Writes a file aside, then renames it over `path`. Workers that memory-mapped the
+    old file keep a valid mapping (truncating it in place would crash them).
+    """
+    with open(path + ".tmp", "wb") as f:
+        write(f)
+    os.replace(path + ".tmp", path)
+
+
+def export(model, modelPath: str, output: str, embeddingMode: str = "float32") -> None:
+    """
+    Writes the vocabulary and weights of a Keras price model to `output`.
+    :param modelPath: File the model was loaded from, hashed as the model version.
+    :param embeddingMode: Storage of the embedding table, see numpy_runtime.quantize_embedding.
+    """
+    import tensorflow as tf
+    layers = tf.keras.layers
+
+    vectorizer, embedding, pooling, *dense = model.layers
+    config = vectorizer.get_config()
+    if (
+        not isinstance(vectorizer, layers.TextVectorization)
+        or config["standardize"] != "lower_and_strip_punctuation"
+        or config["split"] != "whitespace"
+        or config["output_mode"] != "int"
+        or config.get("ngrams")
+        or not isinstance(embedding, layers.Embedding) or not embedding.mask_zero
+        or not isinstance(pooling, layers.GlobalAveragePooling1D)
+        or not all(isinstance(layer, layers.Dense) for layer in dense)
+    ):
+        raise ValueError("Unsupported model architecture, see numpy_runtime.NumpyPriceModel")
+
+    weights = {"embedding": embedding.get_weights()[0]}
+    activations = []
+    for i, layer in enumerate(dense):
+        activation = layer.get_config()["activation"]
+        if activation not in ACTIVATIONS:
+            raise ValueError(f"Unsupported activation in {layer.name}: {activation}")
+        activations.append(activation)
+        weights[f"dense_{i}_kernel"], weights[f"dense_{i}_bias"] = layer.get_weights()
+    for name, array in weights.items():
+        if not np.all(np.isfinite(array)):
+            raise ValueError(f"{name} has non-finite weights: the model must be retrained")
+
+    for name, array in weights.items():
+        weights[name] = array.astype(np.float32)
+    weights["embedding"], scale = quantize_embedding(weights["embedding"], embeddingMode)
+    if scale is not None:
+        weights["embedding_scale"] = scale
+
+    os.makedirs(output, exist_ok=True)
+    for name, array in weights.items():
+        write_atomically(os.path.join(output, f"{name}.npy"), lambda f: np.save(f, array))
+    vocabulary = "\n".join(str(token) for token in vectorizer.get_vocabulary())
+    write_atomically(os.path.join(output, VOCABULARY_FILE), lambda f: f.write(vocabulary.encode("utf-8")))
+    # Written last: it versions the predictions (see inference.model_file)
+    exportConfig = {
+        "model_version": file_version(modelPath),
+        "sequence_length": config["output_sequence_length"],
+        "activations": activations,
+        "embedding": embeddingMode,
+    }
+    write_atomically(os.path.join(output, CONFIG_FILE), lambda f: f.write(json.dumps(exportConfig, indent=2).encode()))
+
+
+def load_titles(count: int) -> list:
+    with open(DATA_PATH, newline="", encoding="utf-8", errors="ignore") as f:
+        titles = [row["Title"] for row in csv.DictReader(f) if row.get("Title")]
+    return EDGE_CASES + titles[:count]
+
+
+def check(model, output: str, count: int, rtol: float, atol: float) -> bool:
+    """Compares the Keras and NumPy predictions. Returns whether they all match."""
+    import tensorflow as tf
+
+    titles = load_titles(count)
+    numpyModel = NumpyPriceModel.load(output)
+    # Keras returns NaN for titles without any token: the runtime does not
+    titles = [title for title in titles if numpyModel.vectorize([title]).any()]
+    expected = np.concatenate([
+        np.asarray(model(tf.constant(titles[i:i + 256]), training=False))[:, 0]
+        for i in range(0, len(titles), 256)
+    ])
+    actual = numpyModel.predict(titles)
+    difference = np.abs(actual - expected)
+    print(f"Parity on {len(titles)} titles: max abs diff {difference.max():.6f}, "
+          f"max rel diff {(difference / np.maximum(np.abs(expected), 1e-6)).max():.2e}")
+    mismatches = ~np.isclose(actual, expected, rtol=rtol, atol=atol)
+    for i in np.flatnonzero(mismatches)[:10]:
+        print(f"  mismatch: {titles[i]!r}: keras {expected[i]:.4f}, numpy {actual[i]:.4f}")
+    return not mismatches.any()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--output", default=NUMPY_MODEL_DIR)
+    parser.add_argument("--check", type=int, default=2000, help="Titles of the CSV compared (0 skips the check)")
+    parser.add_argument("--rtol", type=float, default=1e-4)
+    parser.add_argument("--atol", type=float, default=1e-3)
+    parser.add_argument("--embedding", choices=EMBEDDING_MODES, default="float32")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    model = tf.keras.models.load_model(args.model)
+    export(model, args.model, args.output, args.embedding)
+    print(f"Model exported to {args.output} ({args.embedding} embedding)")
+    matches = not args.check or check(model, args.output, args.check, args.rtol, args.atol)
+    # Quantized embeddings are expected to differ slightly
+    if not matches and args.embedding == "float32":
+        raise SystemExit(1)
@@ -1,26 +1,144 @@
 
 import os
-import tensorflow as tf
+import threading
 import numpy as np
 
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'saved_model.keras')
-_model = None
-
-def load_model():
-    global _model
-    if _model is None:
-        if os.path.exists(MODEL_PATH):
-            _model = tf.keras.models.load_model(MODEL_PATH)
-        else:
-            raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Please run train.py first.")
-    return _model
-
-def predict_price(title):
-    model = load_model()
+# Weights exported from MODEL_PATH by export.py, for the "numpy" backend
+NUMPY_MODEL_DIR = os.path.join(os.path.dirname(__file__), 'numpy_model')
+
+# "tensorflow" runs saved_model.keras; "numpy" runs NUMPY_MODEL_DIR without importing TensorFlow
+BACKENDS = ("tensorflow", "numpy")
+DEFAULT_BACKEND = os.environ.get("PRICE_MODEL_BACKEND", "tensorflow")
+
+class ModelLoader:
+    """
+    Loads the model of each backend once per process, on first use, with its version:
+    the hash of the model file it was loaded from (see model_file). The version is
+    taken when the model is loaded, so it always describes the model serving the
+    predictions, even if the file is replaced afterwards.
+
+    Safe across fork() (gunicorn --preload, multiprocessing): the child gets a new
+    lock, so it cannot inherit one held by another thread of the parent, and drops
+    the TensorFlow models, whose runtime threads do not survive a fork. NumPy models
+    are kept: their memory-mapped weights stay shared with the parent.
+    """
+
+    def __init__(self):
+        self._models = {}  # backend -> (model, version)
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._afterFork)
+
+    def _afterFork(self):
+        self._lock = threading.Lock()
+        self._models = {backend: entry for backend, entry in self._models.items() if backend == "numpy"}
+
+    def _entry(self, backend):
+        entry = self._models.get(backend)
+        if entry is None:
+            # Concurrent first calls load the model once
+            with self._lock:
+                entry = self._models.get(backend)
+                if entry is None:
+                    entry = self._models[backend] = _load_versioned(backend)
+        return entry
+
+    def get(self, backend):
+        return self._entry(backend)[0]
+
+    def version(self, backend):
+        """Returns the version of the model of a backend, loading it if needed."""
+        return self._entry(backend)[1]
+
+    def loadedVersion(self, backend):
+        """Returns the version of the model of a backend, "" if it is not loaded yet (never loads it)."""
+        entry = self._models.get(backend)
+        return entry[1] if entry is not None else ""
+
+_loader = ModelLoader()
+
+def load_model(backend=None):
+    return _loader.get(backend or DEFAULT_BACKEND)
+
+def model_version(backend=None):
+    """Returns the version (model file hash) of the model serving a backend in this process."""
+    return _loader.version(backend or DEFAULT_BACKEND)
+
+def loaded_model_version(backend=None):
+    """Like model_version, but returns "" instead of loading the model."""
+    return _loader.loadedVersion(backend or DEFAULT_BACKEND)
+
+def _load_versioned(backend):
+    """Loads a model and hashes its file, again if the file was replaced during the load."""
+    from price_predictor.cache import file_version
+    path = model_file(backend)
+    while True:
+        before = file_version(path) if os.path.exists(path) else ""
+        model = _load(backend)
+        after = file_version(path)
+        if before == after:
+            return model, after
+
+def _load(backend):
+    if backend == "numpy":
+        from price_predictor.numpy_runtime import NumpyPriceModel
+        if not os.path.isdir(NUMPY_MODEL_DIR):
+            raise FileNotFoundError(f"Model not found at {NUMPY_MODEL_DIR}. Please run export.py first.")
+        # Read-only mapping: the workers of a host share the weights in the page cache
+        return NumpyPriceModel.load(NUMPY_MODEL_DIR, mmap=True)
+    if backend != "tensorflow":
+        raise ValueError(f"Unknown model backend: {backend}, expected one of {BACKENDS}")
+    # TensorFlow is only imported by its own backend
+    import tensorflow as tf
+    if os.path.exists(MODEL_PATH):
+        return tf.keras.models.load_model(MODEL_PATH)
+    raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Please run train.py first.")
+
+def model_file(backend=None):
+    """Returns the file whose content determines the predictions of a backend."""
+    if (backend or DEFAULT_BACKEND) == "numpy":
+        from price_predictor.numpy_runtime import CONFIG_FILE
+        return os.path.join(NUMPY_MODEL_DIR, CONFIG_FILE)
+    return MODEL_PATH
+
+def warmup(backend=None):
+    """
+    Loads the model and runs a dummy batch through it, so the first request
+    pays neither for the deserialization nor for the first forward pass.
+    """
+    predict_prices(["warmup"], backend)
+
+def predict_price(title, backend=None):
+    if (backend or DEFAULT_BACKEND) == "numpy":
+        return float(load_model("numpy").predict([title])[0])
+    import tensorflow as tf
+    model = load_model(backend)
     # Model expects a tensor or numpy array
     prediction = model.predict(tf.constant([title]), verbose=0)
     return float(prediction[0][0])
 
+def predict_prices_versioned(titles, backend=None):
+    """
+    Predicts the prices of several titles with one forward pass.
+    :return: (prices, version of the model that predicted them)
+    """
+    prices = predict_prices(titles, backend)
+    # The model of a process is never reloaded: the loaded version is the one that predicted
+    return prices, model_version(backend)
+
+def predict_prices(titles, backend=None):
+    """
+    Predicts the prices of several titles with one forward pass.
+    Calls the model directly: model.predict() has a large fixed cost per call.
+    """
+    if (backend or DEFAULT_BACKEND) == "numpy":
+        return [float(price) for price in load_model("numpy").predict(titles)]
+    import tensorflow as tf
+    model = load_model(backend)
+    prediction = model(tf.constant(titles), training=False)
+    return [float(price) for price in np.asarray(prediction)[:, 0]]
+
 if __name__ == "__main__":
     # Test
     print(predict_price("Gold Rolex Watch"))
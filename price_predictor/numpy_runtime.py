@@ -0,0 +1,143 @@
+import json
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Characters removed by TextVectorization's "lower_and_strip_punctuation" standardization
+PUNCTUATION = re.compile(r'[!"#$%&()\*\+,\-\./:;<=>?@\[\\\]^_`{|}~\']')
+# tf.strings.lower without an encoding only lowercases ASCII letters
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+# tf.strings.split splits on ASCII whitespace
+WHITESPACE = re.compile(r"[ \t\n\r\f\v]+")
+
+ACTIVATIONS = {
+    "relu": lambda x: np.maximum(x, 0),
+    "linear": lambda x: x,
+}
+
+CONFIG_FILE = "config.json"
+VOCABULARY_FILE = "vocabulary.txt"
+# Storage of the embedding table: the Dense layers are small and stay float32
+EMBEDDING_MODES = ("float32", "float16", "int8")
+
+
+def standardize(title: str) -> str:
+    """Lowercases (ASCII only) and strips punctuation, as the model's TextVectorization layer."""
+    return PUNCTUATION.sub("", title.translate(ASCII_LOWER))
+
+
+def tokenize(title: str) -> List[str]:
+    """Splits a title into the tokens seen by the model."""
+    return [token for token in WHITESPACE.split(standardize(title)) if token]
+
+
+def quantize_embedding(embedding: np.ndarray, mode: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Compresses an embedding table.
+    :param mode: "float32" (unchanged), "float16" (half the size) or "int8" (a quarter,
+        each row scaled by its own largest absolute value).
+    :return: The table, and the float32 scale of each row for int8 (None otherwise).
+    """
+    if mode == "float32":
+        return embedding.astype(np.float32), None
+    if mode == "float16":
+        return embedding.astype(np.float16), None
+    if mode == "int8":
+        scale = np.abs(embedding).max(axis=1) / 127
+        scale[scale == 0] = 1
+        return np.round(embedding / scale[:, np.newaxis]).astype(np.int8), scale.astype(np.float32)
+    raise ValueError(f"Unknown embedding mode: {mode}, expected one of {EMBEDDING_MODES}")
+
+
+class NumpyPriceModel:
+    """
+    The price model (TextVectorization -> Embedding(mask_zero) -> GlobalAveragePooling1D
+    -> Dense layers) evaluated with NumPy, from the files written by export.py.
+    Needs neither TensorFlow nor Keras.
+
+    Titles without any token (empty or only punctuation) get the prediction of an
+    all-zero embedding average, where Keras divides by zero and returns NaN.
+    """
+
+    def __init__(
+        self,
+        vocabulary: List[str],
+        sequenceLength: int,
+        embedding: np.ndarray,
+        dense: List[Tuple[np.ndarray, np.ndarray, str]],
+        version: str = "",
+        embeddingScale: Optional[np.ndarray] = None
+    ):
+        """
+        :param vocabulary: Tokens by index; 0 is padding and 1 is out-of-vocabulary.
+        :param sequenceLength: Tokens kept per title (output_sequence_length).
+        :param embedding: Embedding table, one row per vocabulary index (float32, float16 or int8).
+        :param dense: (kernel, bias, activation) of each Dense layer, in order.
+        :param version: Hash of the Keras model the weights were exported from.
+        :param embeddingScale: Scale of each row of an int8 embedding table.
+        """
+        self.index: Dict[str, int] = {token: i for i, token in enumerate(vocabulary) if i > 1}
+        self.sequenceLength = sequenceLength
+        self.embedding = embedding
+        self.embeddingScale = embeddingScale
+        self.dense = [(kernel, bias, ACTIVATIONS[activation]) for kernel, bias, activation in dense]
+        self.version = version
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = False) -> "NumpyPriceModel":
+        """
+        Loads a model exported by export.py.
+        :param mmap: Map the weight files read-only instead of reading them: the processes
+            of a host then share one page-cache copy of the weights instead of one copy each.
+        """
+        mode = "r" if mmap else None
+        with open(os.path.join(directory, CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+        with open(os.path.join(directory, VOCABULARY_FILE), encoding="utf-8") as f:
+            vocabulary = f.read().split("\n")
+        dense = [
+            (
+                np.load(os.path.join(directory, f"dense_{i}_kernel.npy"), mmap_mode=mode),
+                np.load(os.path.join(directory, f"dense_{i}_bias.npy"), mmap_mode=mode),
+                activation,
+            )
+            for i, activation in enumerate(config["activations"])
+        ]
+        embedding = np.load(os.path.join(directory, "embedding.npy"), mmap_mode=mode)
+        embeddingScale = None
+        if config.get("embedding", "float32") == "int8":
+            embeddingScale = np.load(os.path.join(directory, "embedding_scale.npy"), mmap_mode=mode)
+        return cls(
+            vocabulary, config["sequence_length"], embedding, dense, config.get("model_version", ""), embeddingScale
+        )
+
+    def weightBytes(self) -> int:
+        """Returns the memory used by the weights (embedding table and Dense layers)."""
+        arrays = [self.embedding] + [kernel for kernel, _, _ in self.dense] + [bias for _, bias, _ in self.dense]
+        if self.embeddingScale is not None:
+            arrays.append(self.embeddingScale)
+        return sum(array.nbytes for array in arrays)
+
+    def vectorize(self, titles: List[str]) -> np.ndarray:
+        """Returns the token indices of each title, truncated or zero-padded to the sequence length."""
+        ids = np.zeros((len(titles), self.sequenceLength), dtype=np.int64)
+        for row, title in enumerate(titles):
+            tokens = tokenize(title)[:self.sequenceLength]
+            ids[row, :len(tokens)] = [self.index.get(token, 1) for token in tokens]
+        return ids
+
+    def predict(self, titles: List[str]) -> np.ndarray:
+        """Predicts the prices of a list of titles, in order."""
+        ids = self.vectorize(titles)
+        mask = (ids != 0)[:, :, np.newaxis]
+        vectors = self.embedding[ids].astype(np.float32, copy=False)
+        if self.embeddingScale is not None:
+            vectors *= self.embeddingScale[ids][:, :, np.newaxis]
+        # Masked average of the token embeddings (padding excluded)
+        total = (vectors * mask).sum(axis=1)
+        x = total / np.maximum(mask.sum(axis=1), 1).astype(np.float32)
+        for kernel, bias, activation in self.dense:
+            x = activation(x @ kernel + bias)
+        return x[:, 0]
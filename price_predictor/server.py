@@ -0,0 +1,86 @@
+"""
+Inference server: holds the price model in one process and serves predictions
+to the API workers over a Unix socket, so the workers never load TensorFlow.
+
+Protocol: one JSON object per line. The client sends {"titles": [...]} and gets
+{"prices": [...], "version": "..."} back, in order, with the version (model file
+hash) of the model the server loaded, or {"error": "..."} if the prediction failed.
+Concurrent requests, from any worker, are batched into shared forward passes.
+
+Usage (set PREDICT_SERVER_SOCKET to the same path in the API configuration):
+    python price_predictor/server.py --socket /tmp/price_predictor.sock
+"""
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import time
+from sys import path
+
+path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from price_predictor.batching import PredictionBatcher
+from price_predictor.inference import BACKENDS, DEFAULT_BACKEND, model_version, predict_prices, warmup
+
+# Longest request line accepted (a batch of titles)
+MAX_LINE = 1 << 20
+
+
+async def handle(
+    batcher: PredictionBatcher, version: str, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    """
+    Serves the requests of one client connection until it closes.
+    :param version: Version of the model loaded by the server, sent with every prediction.
+    """
+    try:
+        while line := await reader.readline():
+            try:
+                titles = json.loads(line)["titles"]
+                prices = await asyncio.gather(*(batcher.predict(str(title)) for title in titles))
+                response = {"prices": prices, "version": version}
+            except Exception as e:
+                response = {"error": str(e)}
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+    except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+        print(f"Dropping client: {e}")
+    finally:
+        writer.close()
+
+
+async def main(socketPath: str, batchSize: int, waitMs: float, backend: str):
+    batcher = PredictionBatcher(lambda titles: predict_prices(titles, backend), batchSize, waitMs)
+    start = time.perf_counter()
+    await batcher.call(lambda: warmup(backend))
+    # The model is loaded once: its version holds for the lifetime of the server
+    version = model_version(backend)
+    print(f"Model {version[:12]} loaded and warmed up in {time.perf_counter() - start:.1f}s")
+
+    # A previous server may have left its socket file behind
+    if os.path.exists(socketPath):
+        os.remove(socketPath)
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: handle(batcher, version, reader, writer), socketPath, limit=MAX_LINE
+    )
+    print(f"Serving predictions on {socketPath}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.shutdown()
+        os.remove(socketPath)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default="/tmp/price_predictor.sock")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.socket, args.batch_size, args.wait_ms, args.backend))
+    except KeyboardInterrupt:
+        pass
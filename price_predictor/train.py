@@ -1,18 +1,55 @@
+"""
+Trains the price model on an eBay product CSV.
 
+The CSV is streamed through a tf.data pipeline instead of being loaded in memory:
+rows are cleaned one by one, tokenized in parallel batches, cached to disk during
+the first epoch (the next epochs read the cache instead of parsing the CSV again),
+shuffled within a bounded buffer and prefetched while the model trains.
+
+Usage:
+    python price_predictor/train.py --data dump.csv --cache-dir /var/tmp --epochs 15
+"""
+import argparse
+import csv
+import itertools
+import math
 import os
-import pandas as pd
-import numpy as np
+import re
+import shutil
+import sys
+import tempfile
+
 import tensorflow as tf
 from tensorflow.keras import layers
-import re
 
 # File paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, 'app', 'utils', 'marketing_sample_for_ebay_com-ebay_com_product__20210101_20210331__30k_data.csv')
 MODEL_PATH = os.path.join(os.path.dirname(__file__), 'saved_model.keras')
 
+MAX_TOKENS = 10000
+OUTPUT_SEQUENCE_LENGTH = 20
+EPOCHS = 15
+BATCH_SIZE = 32
+# Share of the cleaned rows held out for validation: the last ones, as Keras' validation_split
+VALIDATION_SPLIT = 0.2
+# Rows shuffled together: bounds the memory used by shuffling, whatever the CSV size
+SHUFFLE_BUFFER = 10000
+# Titles tokenized per call of the vectorizer
+TOKENIZE_BATCH = 1024
+
+# Values read as missing by pandas.read_csv, which the former loader relied on
+NA_VALUES = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+}
+
+# Some titles are longer than the csv module's default field limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
 def clean_price(price_str):
-    if pd.isna(price_str):
+    if price_str is None:
         return None
     # Remove '$', ',', and potential other chars
     price_str = str(price_str)
@@ -23,83 +60,138 @@ def clean_price(price_str):
         return float(match.group(1))
     return None
 
-def load_and_preprocess():
-    print(f"Loading data from {DATA_PATH}...")
-    try:
-        df = pd.read_csv(DATA_PATH, on_bad_lines='skip')
-    except Exception as e:
-        print(f"Error reading CSV: {e}")
-        # Try with a different engine or delimiter if needed
-        df = pd.read_csv(DATA_PATH, on_bad_lines='skip', engine='python') # Fallback
-
-    
-    # Keep only relevant columns
-    df = df[['Title', 'Price']]
-    
-    # Drop missing values
-    df = df.dropna()
 
+def clean_row(row):
+    """
+    Cleans one CSV row.
+    :param row: Row read by csv.DictReader.
+    :return: (title, price), or None if the row is malformed or misses either.
+    """
+    # Malformed row: more fields than the header (stored under None) or fewer (None values)
+    if None in row or None in row.values():
+        return None
+    title, price = row.get('Title'), row.get('Price')
+    if title is None or price is None or title in NA_VALUES or price in NA_VALUES:
+        return None
+    price = clean_price(price)
+    if price is None:
+        return None
     # Clean Title (remove non-ascii to avoid save errors on Windows)
-    df['Title'] = df['Title'].apply(lambda x: re.sub(r'[^\x00-\x7F]+', '', str(x)))
-    
-    # Clean Price
-    df['Price'] = df['Price'].apply(clean_price)
-    df = df.dropna(subset=['Price'])
-    
-    print(f"Data loaded. Shape: {df.shape}")
-    return df
-
-def train_model():
-    df = load_and_preprocess()
-    
-    titles = df['Title'].values
-    prices = df['Price'].values
-    
+    return re.sub(r'[^\x00-\x7F]+', '', title), price
+
+
+def iter_rows(data_path=DATA_PATH):
+    """Streams the cleaned (title, price) rows of a CSV file, in file order."""
+    with open(data_path, newline='', encoding='utf-8', errors='ignore') as f:
+        for row in csv.DictReader(f):
+            cleaned = clean_row(row)
+            if cleaned is not None:
+                yield cleaned
+
+
+def split_index(data_path=DATA_PATH):
+    """Returns the position of the first validation row among the cleaned rows."""
+    count = sum(1 for _ in iter_rows(data_path))
+    return int(math.floor(count * (1 - VALIDATION_SPLIT)))
+
+
+def stream_rows(data_path, start=0, stop=None):
+    """Dataset of the (title, price) cleaned rows in [start, stop), read lazily from the CSV."""
+    return tf.data.Dataset.from_generator(
+        lambda: itertools.islice(iter_rows(data_path), start, stop),
+        output_signature=(
+            tf.TensorSpec(shape=(), dtype=tf.string),
+            tf.TensorSpec(shape=(), dtype=tf.float32),
+        )
+    )
+
+
+def tokenized(rows, vectorizer, cache_file, shuffle_buffer=0, batch_size=BATCH_SIZE):
+    """
+    Training pipeline of a row dataset.
+    :param cache_file: File the tokenized rows are cached to during the first epoch.
+    :param shuffle_buffer: Rows shuffled together, 0 to keep the order.
+    :return: Dataset of prefetched (token ids, price) batches.
+    """
+    dataset = (
+        rows.batch(TOKENIZE_BATCH)
+        .map(lambda titles, prices: (vectorizer(titles), prices), num_parallel_calls=tf.data.AUTOTUNE)
+        .unbatch()
+        # Titles without any token have nothing to average and make the loss NaN
+        .filter(lambda ids, price: tf.reduce_any(ids != 0))
+        .cache(cache_file)
+    )
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def train_model(data_path=DATA_PATH, epochs=EPOCHS, batch_size=BATCH_SIZE, shuffle_buffer=SHUFFLE_BUFFER,
+                cache_dir=None):
+    """
+    Trains the model and saves it to MODEL_PATH.
+    :param cache_dir: Directory of the tokenized dataset cache (the system temporary
+        directory by default), deleted once training is done.
+    """
+    print(f"Streaming data from {data_path}...")
+    split = split_index(data_path)
+    print(f"Training rows: {split}")
+
     # Vectorize text
-    max_tokens = 10000
-    output_sequence_length = 20
-    
     vectorizer = layers.TextVectorization(
-        max_tokens=max_tokens,
+        max_tokens=MAX_TOKENS,
         output_mode='int',
-        output_sequence_length=output_sequence_length
+        output_sequence_length=OUTPUT_SEQUENCE_LENGTH
     )
-    
+
     # Adapt vectorizer to the data
-    vectorizer.adapt(titles)
-    
+    vectorizer.adapt(stream_rows(data_path).map(lambda title, price: title).batch(TOKENIZE_BATCH))
+
     # Build Model
     # Embedding -> GlobalAverageBPooling -> Dense -> Dense
-    
-    model = tf.keras.Sequential([
-        vectorizer,
-        layers.Embedding(input_dim=max_tokens, output_dim=64, mask_zero=True),
+    # The pipeline feeds token ids: the vectorizer is put back in front for the saved model
+    regressor = tf.keras.Sequential([
+        layers.Embedding(input_dim=MAX_TOKENS, output_dim=64, mask_zero=True),
         layers.GlobalAveragePooling1D(),
         layers.Dense(64, activation='relu'),
         layers.Dense(32, activation='relu'),
         layers.Dense(1) # Linear activation for regression
     ])
-    
-    model.compile(loss='mean_absolute_error',
-                  optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-                  metrics=['mae'])
-    
-    # Train
-    print("Starting training...")
-    history = model.fit(
-        titles, 
-        prices,
-        epochs=15, 
-        batch_size=32,
-        validation_split=0.2,
-        verbose=1
-    )
-    
+
+    regressor.compile(loss='mean_absolute_error',
+                      optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
+                      metrics=['mae'])
+
+    cache = tempfile.mkdtemp(prefix='price_model_', dir=cache_dir)
+    try:
+        train = tokenized(
+            stream_rows(data_path, 0, split), vectorizer, os.path.join(cache, 'train'), shuffle_buffer, batch_size
+        )
+        validation = tokenized(
+            stream_rows(data_path, split), vectorizer, os.path.join(cache, 'validation'), batch_size=batch_size
+        )
+
+        # Train
+        print("Starting training...")
+        regressor.fit(train, validation_data=validation, epochs=epochs, verbose=1)
+    finally:
+        shutil.rmtree(cache, ignore_errors=True)
+
+    model = tf.keras.Sequential([tf.keras.Input(shape=(), dtype='string'), vectorizer] + regressor.layers)
+
     # Save model
     model.save(MODEL_PATH)
     print(f"Model saved to {MODEL_PATH}")
-    
+
     return model
 
+
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH, help="CSV with Title and Price columns")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--shuffle-buffer", type=int, default=SHUFFLE_BUFFER)
+    parser.add_argument("--cache-dir", help="Where to cache the tokenized dataset (about 200 bytes per row)")
+    args = parser.parse_args()
+    train_model(args.data, args.epochs, args.batch_size, args.shuffle_buffer, args.cache_dir)